@@ -12,14 +12,20 @@
 # *************************************************************************/
 
 import argparse
+import os
 import os.path
 import random
 import sys
-import json
 import math
 import numpy as np
 import time
 import itertools
+import multiprocessing
+from multiprocessing import shared_memory
+import tsm_distance
+import tsm_moves
+import tsm_localsearch
+import tsm_neighbors
 import tsm_plot
 
 
@@ -34,11 +40,8 @@ import tsm_plot
 # NOTE: The tour is closed, i.e. the length includes the last segment
 # from perm[N-1] back to perm[0]
 def target(perm, distance) :
-    N = len(perm)
-    dist  = distance[perm[N-1], perm[0]]   # last segment to close tour
-    for i in range(N-1):
-        dist += distance[perm[i], perm[i+1]]
-    return dist                     
+    perm = np.asarray(perm)
+    return distance[perm, np.roll(perm, -1)].sum()   # includes perm[N-1] -> perm[0]
      
 
 # make a few random updates and record the changes dE in the target 
@@ -61,66 +64,6 @@ def init(distance, num, fac) :
     return p, T
     
 
-# reverse the section [a, a+l-1] of perm
-# a : in the range 0,...,N-1
-# l : in the range 0,...,N-1
-# These conditions are not checked for efficiency.
-# If b := a + l  > N, set k = a + l - N and 
-# cycle left by k steps; also set a = a-k and b = b-k = N.
-# Then reverse the index range [a,b[ (excluding the end-index b)
-# and return the modified permutation
-def reverse(perm, a, l):
-    N = len(perm)
-    b = a + l
-    if b > N : 
-        k = a + l - N
-        a -= k
-        b -= k
-        perm1 = np.roll(perm, -k)  # makes a copy
-    else :
-        perm1 = np.copy(perm)      # makes a copy
-    perm1[a:b] = perm1[a:b][::-1]
-    return perm1
-
-
-# cut out the section [a, a+l-1] of perm and insert it 
-# a : in the range 0,...,N-1
-# l : in the range 0,...,N-1
-# These conditions are not checked for efficiency.
-# If b := a + l  > N, set k = a + l - N and 
-# cycle left by k steps; also set a = a-k and b = b-k = N.
-# Then cut the sub-array [a,b] (excluding the end-index), 
-# and reinsert the cut-out piece at any location, which may
-# not  be the original location (c != a)
-def relocate(perm, a, l):
-    N = len(perm)
-    b = a + l
-    if b > N : 
-        k = a + l - N
-        a -= k
-        b -= k
-        perm1 = np.roll(perm, -k)     # makes a copy
-    else :
-        perm1 = np.copy(perm)         # makes a copy
-    sec = perm1[a:b]
-    perm1 = np.delete(perm1,np.s_[a:b])
-    while True:
-        c = random.randint(0, len(perm1))
-        if c != a :
-            break
-    return np.insert(perm1, c, sec) 
-
-
-# a potential update of the best permutation: either a reverse() or a 
-# relocate() with random starting point and length
-# NOTE: This returns a modified copy of perm; it does not modify perm
-def update(perm) : 
-    N = len(perm)
-    a = random.randint(0, N-1)
-    l = random.randint(0, N-1)
-    return reverse(perm, a, l) if random.getrandbits(1) else relocate(perm, a, l)
-
-
 # This class stores information about the performance of the algorithm 
 # at each temperature, and the final result
 class history:
@@ -172,8 +115,33 @@ class history:
             return ()
                 
 
+# one Metropolis run at temperature T: propose moves until more than xtot
+# attempts or more than xsuc reductions of E have been made.
+# moves : a tsm_moves.tour, modified in place
+# E     : the current tour length
+# Returns the updated tour length and the number of attempts and reductions
+def metropolis(moves, E, T, xtot, xsuc) :
+    suc = 0
+    tot = 0
+    while tot <= xtot and suc <= xsuc : 
+        dE, move = moves.propose()
+        tot += 1 
+        if dE < 0 : 
+            moves.apply(move)
+            E += dE
+            suc += 1
+        else :
+            r = math.exp(- dE / T)
+            q = random.random()
+            if(q < r) : 
+                moves.apply(move)
+                E += dE
+    return E, tot, suc
+
+
 # the main computation method
-def compute(distance): 
+# neighbors : optional candidate lists (see tsm_neighbors) restricting the moves
+def compute(distance, neighbors=None): 
     # get problem size N
     rows,cols = distance.shape
     if rows != cols or rows < 2: 
@@ -194,50 +162,139 @@ def compute(distance):
     E = target(perm, distance)
     converged = False
     
+    # the moves are evaluated from the changed edges only and applied in place
+    moves = tsm_moves.tour(perm, distance, neighbors)
+    
     # bookkeeping: history collects statistical information for each temperature
     histo = history()
     
     # main loop
-    suc = 0
-    tot = 0
     while True : 
-        # Metropolis
-        perm1 = update(perm)
-        E1 = target(perm1, distance)
-        tot += 1 
-        if E1 < E : 
-            perm = perm1
-            E = E1
-            suc += 1
-        else :
-            dE = E1 - E
-            r = math.exp(- dE / T)
-            q = random.random()
-            if(q < r) : 
-                perm = perm1
-                E = E1
-        # check if we're done at this temperature
-        if tot > xtot or suc > xsuc : 
-            # okay: store results at this temperature
-            Ex = target(perm, distance)
-            histo.record(T, tot, suc, perm, E)
-           
-            # check convergence: no substantial reduction at last temperatures
-            # make at least ten reduction steps to avoid spurious convergence
-            if histo.size() > max(cnum, 10) :
-                Emax, Emin = histo.last_target(cnum)
-                if (Emax - Emin) < eps * Emax : 
-                    converged = True
-                    break;
-                
-            # not converged: reduce temperature
-            suc = 0
-            tot = 0
-            T *= fac;
+        # Metropolis at this temperature
+        E, tot, suc = metropolis(moves, E, T, xtot, xsuc)
+        
+        # store results at this temperature; recompute E to avoid the 
+        # accumulation of rounding errors in the updates
+        perm = moves.perm.copy()
+        E = target(perm, distance)
+        histo.record(T, tot, suc, perm, E)
+       
+        # check convergence: no substantial reduction at last temperatures
+        # make at least ten reduction steps to avoid spurious convergence
+        if histo.size() > max(cnum, 10) :
+            Emax, Emin = histo.last_target(cnum)
+            if (Emax - Emin) < eps * Emax : 
+                converged = True
+                break;
+            
+        # not converged: reduce temperature
+        T *= fac;
              
     # we have converged
     return histo
     
+
+# --------------------------------------------------------------------------
+# parallel tempering
+# --------------------------------------------------------------------------
+
+# Worker side of compute_parallel(): each worker process attaches once to 
+# the distance matrix in shared memory, the tasks only carry the tours.
+g_shared    = None
+g_distance  = None
+g_neighbors = None
+
+def attach(name, shape, dtype, neighbors) :
+    global g_shared, g_distance, g_neighbors
+    g_shared = shared_memory.SharedMemory(name=name)
+    g_distance = np.ndarray(shape, dtype=dtype, buffer=g_shared.buf)
+    g_neighbors = neighbors
+
+
+# one Metropolis run of a replica in a worker process, see metropolis()
+def sweep(args) :
+    perm, E, T, xtot, xsuc, seed = args
+    random.seed(seed)
+    moves = tsm_moves.tour(perm, g_distance, g_neighbors)
+    E, tot, suc = metropolis(moves, E, T, xtot, xsuc)
+    return moves.perm, target(moves.perm, g_distance), tot, suc
+
+
+# Parallel tempering: K replicas start from independent random tours and run
+# at the temperatures T, T*ladder, ..., T*ladder^(K-1) in a process pool. 
+# After each Metropolis run, the states of neighboring temperatures are 
+# exchanged with the probability min(1, exp((E_k - E_k+1)(1/T_k - 1/T_k+1))),
+# then all temperatures are reduced as in compute(). Convergence is checked
+# on the coldest replica.
+# Returns (perm, E) of the best tour seen and the list of the K histories,
+# where history k belongs to the k-th coldest temperature.
+def compute_parallel(distance, replicas=4, processes=None, ladder=1.5, neighbors=None): 
+    # get problem size N
+    rows,cols = distance.shape
+    if rows != cols or rows < 2 or replicas < 1: 
+        raise ValueError;
+    N = rows
+    K = replicas
+     
+    # some hard-coded constants, see compute()
+    inum = 10*N
+    ifac = 5.0
+    eps  = 0.0001
+    cnum = 3
+    fac  = 0.90
+    xsuc = 10*N
+    xtot = 100*N
+    
+    # initialize: one start tour per replica
+    perm, T = init(distance, inum, ifac)
+    perms = [perm] + [np.random.permutation(N) for k in range(1, K)]
+    E = [target(p, distance) for p in perms]
+    temps = [T * ladder**k for k in range(K)]
+    histos = [history() for k in range(K)]
+    k = int(np.argmin(E))
+    best = (perms[k], E[k])
+    
+    # the distance matrix is copied once into shared memory, not pickled 
+    # with every task
+    shm = shared_memory.SharedMemory(create=True, size=distance.nbytes)
+    try:
+        shared = np.ndarray(distance.shape, dtype=distance.dtype, buffer=shm.buf)
+        shared[:] = distance
+        if processes is None :
+            processes = min(K, os.cpu_count() or 1)
+        with multiprocessing.Pool(processes, attach, (shm.name, distance.shape, distance.dtype.str, neighbors)) as pool : 
+            while True : 
+                # Metropolis at the current temperatures
+                tasks = [(perms[k], E[k], temps[k], xtot, xsuc, random.getrandbits(32)) for k in range(K)]
+                results = pool.map(sweep, tasks)
+                for k in range(K) :
+                    perms[k], E[k], tot, suc = results[k]
+                    histos[k].record(temps[k], tot, suc, perms[k], E[k])
+                    if E[k] < best[1] :
+                        best = (perms[k], E[k])
+                
+                # replica exchange between neighboring temperatures
+                for k in range(K-1) :
+                    x = (E[k] - E[k+1]) * (1/temps[k] - 1/temps[k+1])
+                    if x >= 0 or random.random() < math.exp(x) :
+                        perms[k], perms[k+1] = perms[k+1], perms[k]
+                        E[k], E[k+1] = E[k+1], E[k]
+                
+                # check convergence of the coldest replica, see compute()
+                if histos[0].size() > max(cnum, 10) :
+                    Emax, Emin = histos[0].last_target(cnum)
+                    if (Emax - Emin) < eps * Emax : 
+                        break;
+                
+                # not converged: reduce temperatures
+                temps = [T * fac for T in temps]
+    finally:
+        shm.close()
+        shm.unlink()
+        
+    # we have converged
+    return best, histos
+    
     
 # --------------------------------------------------------------------------
 # the main entry point
@@ -247,7 +304,19 @@ def main():
     # parse command line arguments
     print("")
     parser = argparse.ArgumentParser()
-    parser.add_argument("infile", help="input file with TSM problem as json")
+    parser.add_argument("infile", help="input file with TSM problem as json or .npy")
+    parser.add_argument("--cache", action="store_true", default=None,
+                        help="cache the distance matrix on disk (default: environment variable TSM_CACHE=1)")
+    parser.add_argument("-r", "--replicas", type=int, default=1,
+                        help="number of replicas for parallel tempering (default 1: single chain)")
+    parser.add_argument("-k", "--neighbors", type=int, default=0,
+                        help="restrict the moves to the k nearest neighbors (default 0: all cities)")
+    parser.add_argument("-O", "--optimize", action="store_true",
+                        help="post-optimize the tour by local search (2-opt, Or-opt)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the plot of the tour to this file (png, svg, ...) instead of showing it")
+    parser.add_argument("--decimate", type=int, default=1,
+                        help="only plot every k-th city of the tour (with --output)")
     args = parser.parse_args()
     prog = os.path.basename(__file__)
     infile = args.infile
@@ -256,41 +325,52 @@ def main():
     # read problem from input file
     cities = []
     try:
-        with open(infile, "r") as f : 
-            cities = json.load(f)
-            count  = len(cities)
-    except:
-        print(f"{prog}: error: input file corrupted or invalid json data")
+        cities = tsm_distance.read(infile)
+        count  = len(cities)
+    except (OSError, ValueError):
+        print(f"{prog}: error: input file corrupted or invalid json or .npy data")
     print(f"   + found TSM problem with N={count} cities") 
             
     # create distance matrix
     print(f"   + setting up distance matrix")
-    distance = np.zeros([count,count])
-    irange = range(count)
-    for i in irange :
-        for k in irange :
-            a = cities[i]
-            b = cities[k]
-            d0 = a[0]-b[0]
-            d1 = a[1]-b[1]
-            distance[i, k] = math.sqrt(d0*d0 + d1*d1)
+    distance = tsm_distance.load(infile, cities, cache=args.cache)
+    neighbors = None
+    if args.neighbors > 0 :
+        print(f"   + setting up lists of {args.neighbors} nearest neighbors")
+        neighbors = tsm_neighbors.candidates(cities, args.neighbors)
+    if args.optimize and neighbors is None :
+        print(f"   + setting up lists of {tsm_localsearch.g_neighbors} nearest neighbors for the local search")
+        lsneighbors = tsm_neighbors.candidates(cities, tsm_localsearch.g_neighbors)
+    else :
+        lsneighbors = neighbors
             
     # do computation, take timings
     print(f"   + starting calculation, this may take some time ... ")
     try:
         start = time.perf_counter()
-        histo = compute(distance)  
+        if args.replicas > 1 :
+            (sol, Emin), histos = compute_parallel(distance, args.replicas, neighbors=neighbors)
+        else :
+            histo = compute(distance, neighbors)  
+            sol, Emin = histo.best()
+            histos = [histo]
+        found = Emin
+        if args.optimize :
+            sol, Emin = tsm_localsearch.optimize(sol, distance, lsneighbors)
+            sol = np.array(sol)
         stop  = time.perf_counter()
     except:
         print(f"{prog}: error: internal error in main computation")
         sys.exit()
     print(f"   + finished calculation")
+    if args.optimize :
+        print(f"   + local search improved the length from {found} to {Emin}")
     
     # get solution and timings
-    Tmax, Tmin = histo.temp_range()   
-    nsteps = histo.size()
-    total = histo.total()
-    sol, Emin = histo.best()
+    Tmax = max(h.temp_range()[0] for h in histos)
+    Tmin = min(h.temp_range()[1] for h in histos)
+    nsteps = histos[0].size()
+    total = sum(h.total() for h in histos)
     
     # prepare solution for display:
     #   - cycle such that city #0 is in slot 0
@@ -307,6 +387,7 @@ def main():
     # present results
     print("\n-----------\n")
     print(f"   + size          : {count}")
+    print(f"   + replicas      : {len(histos)}")
     print(f"   + Tmax          : {Tmax}")
     print(f"   + Tmin          : {Tmin}")
     print(f"   + T steps       : {nsteps}")
@@ -323,7 +404,11 @@ def main():
   
     # plot solution
     print("")
-    tsm_plot.plot(cities,xsol)
+    if args.output :
+        print(f"   + writing plot to '{args.output}'")
+        tsm_plot.save(cities, xsol, args.output, args.decimate)
+    else :
+        tsm_plot.plot(cities,xsol)
     return 
 
 
@@ -15,11 +15,13 @@ import argparse
 import os.path
 import random
 import sys
-import json
 import math
 import numpy as np
 import time
 import itertools
+import tsm_distance
+import tsm_localsearch
+import tsm_neighbors
 import tsm_plot
 
 
@@ -41,112 +43,120 @@ g_init        = 0.1           # initial pheromone level at all edges
 
 
 # --------------------------------------------------------------------------
-# The ant agent 
+# The ant colony
 # --------------------------------------------------------------------------
 
-class ant :
-    def __init__(self, distance, pheromone):
+# All ants of the colony are advanced together: row a of the arrays belongs
+# to ant #a. The tours are kept in an integer matrix, the visited cities in 
+# a boolean mask, and the next cities of all ants are drawn at once from the
+# probabilities pheromone^alpha * visibility^beta of the non-visited cities.
+# With candidate lists (see tsm_neighbors), only the non-visited candidates 
+# of the current city are considered; ants whose candidates have all been 
+# visited draw from all non-visited cities.
+class colony :
+    def __init__(self, distance, pheromone, count, neighbors=None):
         # check arguments
         rows, cols = distance.shape
         if (rows != cols) or (rows < 1) : 
-            raise ValueError("ant: invalid distance matrix in constructor")
+            raise ValueError("colony: invalid distance matrix in constructor")
         prows, pcols = pheromone.shape
         if (prows != rows) or (pcols != cols) :
-            raise ValueError("ant: invalid pheromone matrix in constructor")
+            raise ValueError("colony: invalid pheromone matrix in constructor")
+        if count < 1 :
+            raise ValueError("colony: invalid number of ants in constructor")
         # initialize class
         self.__dist   = distance
-        self.__phero  = pheromone
-        self.__count  = rows
-        self.reset()
-        
-    def reset(self):
-        self.__path = []
-        self.__rest  = list(range(self.__count))
-        n = random.randint(0, self.__count-1)
-        self.extend(n)
-        
-    # check if the current path is complete
-    def is_complete(self) : 
-        return len(self.__path) == self.__count
+        self.__phero  = pheromone       # modified in place by deposit()
+        self.__count  = count
+        self.__size   = rows
+        # visibility^beta, the diagonal is never used
+        with np.errstate(divide="ignore"):
+            vis = 1 / np.asarray(distance, dtype=np.float64)
+        np.fill_diagonal(vis, 0)
+        self.__heur   = vis ** g_beta
+        self.__cand   = neighbors
+        self.tours    = None
+        self.lengths  = None
     
-    # check if the current path has an edge from i to k
-    def has_edge(self, i, k):
-        try:
-            a = self.__path.index(i)
-            b = self.__path.index(k)
-            return abs(a-b) == 1
-        except:
-            return False
-        
-    # length of the current path in Euclidean metric
-    def length(self):
-        N = len(self.__path)
-        s = 0
-        if N > 1 :
-            for i in range(N-1):
-                s += self.__dist[self.__path[i], self.__path[i+1]]
-            s += self.__dist[self.__path[-1], self.__path[0]]    # close path
-        return s
+    # let every ant find a complete tour from a random start city at the 
+    # current pheromone level; returns the tours (one per row) and lengths
+    def solve(self):
+        M = self.__count
+        N = self.__size
+        ants = np.arange(M)
+        weight = (self.__phero ** g_alpha) * self.__heur
+        tours = np.empty((M, N), dtype=np.intp)
+        visited = np.zeros((M, N), dtype=bool)
+        tours[:, 0] = np.random.randint(0, N, M)
+        visited[ants, tours[:, 0]] = True
+        for step in range(1, N) :
+            cur = tours[:, step-1]
+            if self.__cand is None :
+                node = self.__select(weight[cur], visited)
+            else :
+                # roulette over the candidates, full rows where none is left
+                cand = self.__cand[cur]
+                w = weight[cur[:, np.newaxis], cand]
+                w[visited[ants[:, np.newaxis], cand]] = 0
+                i = self.__roulette(w)
+                node = np.empty(M, dtype=np.intp)
+                ok = i < cand.shape[1]
+                node[ok] = cand[ok, i[ok]]
+                full = ~ok
+                if full.any() :
+                    node[full] = self.__select(weight[cur[full]], visited[full])
+            tours[:, step] = node
+            visited[ants, node] = True
+        self.tours = tours
+        self.lengths = np.asarray(self.__dist[tours, np.roll(tours, -1, axis=1)]).sum(axis=1)
+        return self.tours, self.lengths
     
-    # extend the current path by adding a segment from the currently 
-    # last city to the new city #n. This checks that n is from the 
-    # list of non-visited cities, and the routine updates the current
-    # tour length in self.__length
-    def extend(self, n) :
-        if n in self.__rest :
-            self.__rest.remove(n)
-            self.__path.append(n)
-        else:
-            # we have already visited n 
-            raise ValueError("ant: cannot extend(), city already visited [internal]")
+    # roulette wheel selection in every row of the weights w; returns the 
+    # selected column per row, or the number of columns if all weights are 0
+    def __roulette(self, w):
+        q = np.cumsum(w, axis=1)
+        r = np.random.random(len(w)) * q[:, -1]
+        return (q <= r[:, np.newaxis]).sum(axis=1)
     
-    # find a complete tour
-    def solve(self):
-        while not self.is_complete() :
-            x = self.__path[-1]
-            # find best next node based on visibility and pheromone
-            q = []
-            s = 0
-            for y in self.__rest : 
-                vis = 1/self.__dist[x,y]
-                phe = self.__phero[x,y]
-                r = (phe**g_alpha) * (vis**g_beta)
-                s += r
-                q.append(s)
-            p = [r/s for r in q]        # p[-1] should be 1.0
-            r = random.random()
-            i = 0
-            while r > p[i] :
-                i += 1
-            node = self.__rest[i]
-            self.extend(node)           # will shrink __rest and grow __tour
-        total = self.length()           # length of completed tour
-        return self.__path, total
+    # select the next city among all non-visited cities (w is a copy)
+    def __select(self, w, visited):
+        w[visited] = 0
+        node = self.__roulette(w)
+        # zero weights (underflow) or rounding: take any non-visited city
+        bad = node >= self.__size
+        if bad.any() :
+            node[bad] = np.argmin(visited[bad], axis=1)
+        return node
+    
+    # pheromone update: evaporation, then each ant deposits intensity/length 
+    # on all edges of its closed tour (in both directions), done as a single
+    # scatter-add over the edges of all ants
+    def deposit(self):
+        N = self.__size
+        i = self.tours.ravel()
+        k = np.roll(self.tours, -1, axis=1).ravel()
+        q = np.repeat(g_intensity / self.lengths, N)
+        self.__phero *= (1 - g_evap)
+        np.add.at(self.__phero, (np.concatenate((i, k)), np.concatenate((k, i))), np.concatenate((q, q)))
         
 
 # --------------------------------------------------------------------------
 # main computation routines
 # --------------------------------------------------------------------------
 
-def compute(distance): 
+def compute(distance, neighbors=None): 
     # get problem size N
     rows,cols = distance.shape
     if rows != cols or rows < 2: 
         raise ValueError;
     N = rows
-    irange = range(N)    
     
     # initialize pheromone matrix
     pheromone = np.full([N,N], g_init) 
     print("   + pheromone initialized")
 
     # create ant colony
-    colony = set()
-    count  = 0
-    while count < g_ant_count :
-        A = ant(distance, pheromone)    # arguments passed by reference
-        colony.add(A)                   # i.e. changes in pheromone will be 
-        count += 1                      # noticed by A
+    ants = colony(distance, pheromone, g_ant_count, neighbors)   # pheromone passed by reference
     print("   + ant colony created")
     
     # main loop
@@ -156,25 +166,16 @@ def compute(distance):
     best   = 100 * N                     # impossible value, tour length must be < N*sqrt(2)  
     print("   + starting main loop")
     while gen < g_generations : 
-        # let all ants complete a tour
-        for A in colony : 
-            A.reset()                    # place at arbitrary start point, do not change pheromone
-            tour, L = A.solve()          # solve from arbitrary start point at given pheromone
-            if L < best:
-                best = L
-                sol  = tour
+        # let all ants complete a tour from arbitrary start points at given pheromone
+        tours, lengths = ants.solve()
+        a = np.argmin(lengths)
+        if lengths[a] < best:
+            best = lengths[a]
+            sol  = tours[a].tolist()
         histo.append(best)
         
         # Pheromone update
-        for i in irange : 
-            for k in irange :
-                if(k == i) :
-                    continue
-                pherosum = 0
-                for A in colony : 
-                    if A.has_edge(i,k):
-                        pherosum += 1/A.length()
-                pheromone[i,k] = pheromone[i,k] * (1 - g_evap) + g_intensity * pherosum
+        ants.deposit()
         
         # check for convergence
         gen += 1
@@ -197,7 +198,17 @@ def main():
     # parse command line arguments
     print("")
     parser = argparse.ArgumentParser()
-    parser.add_argument("infile", help="input file with TSM problem as json")
+    parser.add_argument("infile", help="input file with TSM problem as json or .npy")
+    parser.add_argument("--cache", action="store_true", default=None,
+                        help="cache the distance matrix on disk (default: environment variable TSM_CACHE=1)")
+    parser.add_argument("-k", "--neighbors", type=int, default=0,
+                        help="restrict the next city to the k nearest neighbors (default 0: all cities)")
+    parser.add_argument("-O", "--optimize", action="store_true",
+                        help="post-optimize the tour by local search (2-opt, Or-opt)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the plot of the tour to this file (png, svg, ...) instead of showing it")
+    parser.add_argument("--decimate", type=int, default=1,
+                        help="only plot every k-th city of the tour (with --output)")
     args = parser.parse_args()
     prog = os.path.basename(__file__)
     infile = args.infile
@@ -206,35 +217,40 @@ def main():
     # read problem from input file
     cities = []
     try:
-        with open(infile, "r") as f : 
-            cities = json.load(f)
-            count  = len(cities)
-    except:
-        print(f"{prog}: error: input file corrupted or invalid json data")
+        cities = tsm_distance.read(infile)
+        count  = len(cities)
+    except (OSError, ValueError):
+        print(f"{prog}: error: input file corrupted or invalid json or .npy data")
     print(f"   + found TSM problem with N={count} cities") 
             
     # create distance matrix
     print(f"   + setting up distance matrix")
-    distance = np.zeros([count,count])
-    irange = range(count)
-    for i in irange :
-        for k in irange :
-            a = cities[i]
-            b = cities[k]
-            d0 = a[0]-b[0]
-            d1 = a[1]-b[1]
-            distance[i, k] = math.sqrt(d0*d0 + d1*d1)
+    distance = tsm_distance.load(infile, cities, cache=args.cache)
+    neighbors = None
+    if args.neighbors > 0 :
+        print(f"   + setting up lists of {args.neighbors} nearest neighbors")
+        neighbors = tsm_neighbors.candidates(cities, args.neighbors)
+    if args.optimize and neighbors is None :
+        print(f"   + setting up lists of {tsm_localsearch.g_neighbors} nearest neighbors for the local search")
+        lsneighbors = tsm_neighbors.candidates(cities, tsm_localsearch.g_neighbors)
+    else :
+        lsneighbors = neighbors
           
     # do computation, take timings
     print(f"   + starting calculation, this may take some time ... ")
     #try:
     start = time.perf_counter()
-    sol, Lmin, niter  = compute(distance)  
+    sol, Lmin, niter  = compute(distance, neighbors)  
+    found = Lmin
+    if args.optimize :
+        sol, Lmin = tsm_localsearch.optimize(sol, distance, lsneighbors)
     stop  = time.perf_counter()
     #except:
         #print(f"{prog}: error: internal error in main computation")
         #sys.exit()
     print(f"   + finished calculation")
+    if args.optimize :
+        print(f"   + local search improved the length from {found} to {Lmin}")
     
     # prepare solution for display:
     #   - cycle such that city #0 is in slot 0
@@ -266,7 +282,11 @@ def main():
   
     # plot solution
     print("")
-    tsm_plot.plot(cities,xsol)
+    if args.output :
+        print(f"   + writing plot to '{args.output}'")
+        tsm_plot.save(cities, xsol, args.output, args.decimate)
+    else :
+        tsm_plot.plot(cities,xsol)
     return 
 
 
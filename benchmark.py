@@ -0,0 +1,276 @@
+# ***************************************************************************
+# $Id $
+# **************************************************************************/
+##
+# @file     tsm/benchmark.py
+# @brief    Compares the solvers of the traveling salesman problem (TSM)
+#           on a common suite of instances
+# @author   Markus Quandt  \n<markus.quandt@uni-tuebingen.de>
+#
+# $Date: 2021/06/28 00:43:44 $
+# $Revision: cd9b473d1654 $
+#
+# *************************************************************************/
+
+import argparse
+import contextlib
+import csv
+import json
+import multiprocessing
+import os
+import os.path
+import random
+import sys
+import time
+import tracemalloc
+import numpy as np
+import anneal
+import ant
+import direct
+import generate
+import greedy
+import heldkarp
+import tsm_distance
+
+
+# --------------------------------------------------------------------------
+# Global parameters
+# --------------------------------------------------------------------------
+
+g_sizes   = [8, 12, 16, 50, 200]    # problem sizes of the generated suite
+g_seeds   = 2                       # generated instances per size
+g_timeout = 60.0                    # time budget (s) of one solver run
+
+# the solvers, each returning (tour, length), and the largest problem they
+# are run on; the exact solvers provide the optimum for the gap
+def run_greedy(distance):
+    return greedy.compute(distance)
+
+def run_anneal(distance):
+    return anneal.compute(distance).best()
+
+def run_ant(distance):
+    sol, best, gen = ant.compute(distance)
+    return sol, best
+
+def run_direct(distance):
+    return direct.compute(distance)
+
+def run_heldkarp(distance):
+    return heldkarp.compute(distance)
+
+g_solvers = {
+    "greedy"   : (run_greedy,   None),
+    "anneal"   : (run_anneal,   None),
+    "ant"      : (run_ant,      None),
+    "direct"   : (run_direct,   9),
+    "heldkarp" : (run_heldkarp, 18),
+}
+g_exact   = ["heldkarp", "direct"]
+
+
+# --------------------------------------------------------------------------
+# single runs
+# --------------------------------------------------------------------------
+
+# Run one solver on the cities in a child process and send the result
+# through the pipe 'conn'. The random generators are seeded, so runs are
+# reproducible; the output of the solver is suppressed. The timed run is
+# done without tracing, since tracemalloc slows down the pure Python solvers
+# considerably. If 'memory' is set, the peak of the Python and NumPy
+# allocations is measured afterwards by a second, identically seeded run
+# under tracemalloc and sent as a separate message.
+def run(solver, cities, seed, memory, conn):
+    try:
+        distance = tsm_distance.matrix(cities)
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null) :
+            random.seed(seed)
+            np.random.seed(seed)
+            start = time.perf_counter()
+            sol, length = g_solvers[solver][0](distance)
+            stop = time.perf_counter()
+        # check the tour independently of the solver
+        sol = np.asarray(sol)
+        valid = len(sol) == len(cities) and bool((np.sort(sol) == np.arange(len(cities))).all())
+        if valid :
+            length = float(distance[sol, np.roll(sol, -1)].sum())
+        conn.send(("ok" if valid else "invalid", stop - start, None, float(length)))
+        if memory and valid :
+            with open(os.devnull, "w") as null, contextlib.redirect_stdout(null) :
+                random.seed(seed)
+                np.random.seed(seed)
+                tracemalloc.start()
+                g_solvers[solver][0](distance)
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            conn.send(peak)
+    except Exception as e:
+        conn.send((f"error: {type(e).__name__}", None, None, None))
+    conn.close()
+
+
+# Run all jobs (instance index, solver) with at most 'processes' child
+# processes at the same time. A run exceeding 'timeout' seconds is
+# terminated; the memory measurement (see run()) gets its own budget of
+# 'timeout' seconds and is dropped if it exceeds it. Returns a dict
+# (instance index, solver) -> result tuple.
+def run_all(instances, jobs, timeout, processes, memory=True):
+    results = {}
+    pending = list(jobs)
+    running = []
+    while pending or running :
+        # start new runs
+        while pending and len(running) < processes :
+            k, solver = pending.pop(0)
+            name, seed, cities = instances[k]
+            recv, send = multiprocessing.Pipe(duplex=False)
+            p = multiprocessing.Process(target=run, args=(solver, cities, seed, memory, send))
+            p.start()
+            send.close()
+            running.append((k, solver, p, recv, time.perf_counter(), None))
+        # collect finished runs, terminate runs over budget; 'timed' is the
+        # result of the timed run while the memory is being measured
+        still = []
+        for k, solver, p, recv, start, timed in running :
+            if recv.poll() :
+                try:
+                    r = recv.recv()
+                except EOFError:
+                    r = timed or ("error: no result", None, None, None)
+                if timed is not None :
+                    r = timed[:2] + (r,) + timed[3:] if isinstance(r, int) else timed
+                elif memory and r[0] == "ok" :
+                    still.append((k, solver, p, recv, time.perf_counter(), r))
+                    continue
+                results[k, solver] = r
+                p.join()
+            elif not p.is_alive() :
+                results[k, solver] = timed or (f"error: exit code {p.exitcode}", None, None, None)
+            elif time.perf_counter() - start > timeout :
+                p.terminate()
+                p.join()
+                results[k, solver] = timed or ("timeout", None, None, None)
+            else :
+                still.append((k, solver, p, recv, start, timed))
+                continue
+            print(f"   + {instances[k][0]:<24} {solver:<10}: {results[k, solver][0]}")
+        running = still
+        time.sleep(0.01)
+    return results
+
+
+# --------------------------------------------------------------------------
+# the report
+# --------------------------------------------------------------------------
+
+# one row per run: the gap is the relative excess over the optimum found by
+# an exact solver on the same instance (None if there is no optimum)
+def report(instances, solvers, results):
+    rows = []
+    for k, (name, seed, cities) in enumerate(instances) :
+        optimum = None
+        for s in g_exact :
+            r = results.get((k, s))
+            if r is not None and r[0] == "ok" :
+                optimum = r[3]
+                break
+        for s in solvers :
+            if (k, s) not in results :
+                continue
+            status, wall, peak, length = results[k, s]
+            gap = None
+            if status == "ok" and optimum is not None and optimum > 0 :
+                gap = (length - optimum) / optimum
+            rows.append({"instance": name, "size": len(cities), "seed": seed,
+                         "solver": s, "status": status, "time": wall,
+                         "peak_memory": peak, "length": length,
+                         "optimum": optimum, "gap": gap})
+    return rows
+
+
+# write the rows as json, or as csv if the file name ends with '.csv'
+def write(rows, outfile):
+    with open(outfile, "w", newline="") as f :
+        if outfile.endswith(".csv") :
+            w = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else [])
+            w.writeheader()
+            w.writerows(rows)
+        else :
+            json.dump(rows, f, indent=2)
+
+
+# --------------------------------------------------------------------------
+# the main entry point
+# --------------------------------------------------------------------------
+
+def main():
+    # parse command line arguments
+    print("")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("infiles", nargs="*", help="TSM problems as json or .npy (default: a generated suite)")
+    parser.add_argument("-n", "--sizes", type=int, nargs="+", default=g_sizes,
+                        help="problem sizes of the generated suite")
+    parser.add_argument("-s", "--seeds", type=int, default=g_seeds,
+                        help="number of generated instances per size")
+    parser.add_argument("-S", "--solvers", nargs="+", default=list(g_solvers), choices=list(g_solvers),
+                        help="solvers to compare")
+    parser.add_argument("-t", "--timeout", type=float, default=g_timeout,
+                        help="time budget of one solver run in seconds")
+    parser.add_argument("-p", "--processes", type=int, default=os.cpu_count(),
+                        help="number of runs in parallel")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the separate run measuring the peak memory")
+    parser.add_argument("-o", "--output", default="benchmark.json",
+                        help="report file, csv if it ends with '.csv', json otherwise")
+    args = parser.parse_args()
+    prog = os.path.basename(__file__)
+
+    # read or generate the instances (name, seed, cities)
+    instances = []
+    if args.infiles :
+        for infile in args.infiles :
+            try:
+                cities = np.asarray(tsm_distance.read(infile), dtype=np.float64)
+            except:
+                print(f"{prog}: error: input file '{infile}' corrupted or invalid data")
+                sys.exit()
+            instances.append((os.path.basename(infile), 0, cities))
+    else :
+        for count in args.sizes :
+            for seed in range(args.seeds) :
+                instances.append((f"random-{count}-{seed}", seed, generate.create(count, seed=seed)))
+    print(f"   + {len(instances)} instances, solvers {', '.join(args.solvers)}")
+
+    # the exact solvers run first, all others on the sizes they can handle
+    solvers = [s for s in g_exact if s in args.solvers] + [s for s in args.solvers if s not in g_exact]
+    jobs = []
+    for k, (name, seed, cities) in enumerate(instances) :
+        for s in solvers :
+            limit = g_solvers[s][1]
+            if limit is None or len(cities) <= limit :
+                jobs.append((k, s))
+    print(f"   + starting {len(jobs)} runs on {args.processes} processes, budget {args.timeout} s each")
+    results = run_all(instances, jobs, args.timeout, max(args.processes, 1), not args.no_memory)
+
+    # present and write the report
+    rows = report(instances, args.solvers, results)
+    print("\n-----------\n")
+    print(f"   + {'instance':<24} {'solver':<10} {'time [s]':>10} {'memory [MB]':>12} {'length':>12} {'gap':>8}")
+    for r in rows :
+        if r["status"] != "ok" :
+            print(f"   + {r['instance']:<24} {r['solver']:<10} {r['status']}")
+            continue
+        gap = f"{100 * r['gap']:7.2f}%" if r["gap"] is not None else ""
+        mem = f"{r['peak_memory'] / 1024**2:12.2f}" if r["peak_memory"] is not None else ""
+        print(f"   + {r['instance']:<24} {r['solver']:<10} {r['time']:10.3f} {mem:>12} {r['length']:12.5f} {gap:>8}")
+    print(f"\n   + writing report to '{args.output}'")
+    write(rows, args.output)
+    return
+
+
+# --------------------------------------------------------------------------
+# run main() as a script only, not when importing this file as a module
+# --------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
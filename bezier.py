@@ -2,10 +2,165 @@
 
 from cagd.vec import Vec2, Vec3
 from cagd.polyline import Polyline
+from cagd.points import PointArray, to_array
+import numpy as np
+import math
 import copy
+import functools
+import io
+import multiprocessing
+from multiprocessing import shared_memory
+import cagd.meshwriter as meshwriter
+
+
+# Returns the matrices (L, R) of the subdivision of a bezier curve of the
+# given degree at t: the control points of the parts for [0, t] and [t, 1]
+# are L @ P and R @ P for the control points P of the curve.
+# The rows of L and R are the outer edges of the de Casteljau pyramid,
+# L[k, j] = B^k_j(t) and R[n - k, n - k + j] = B^k_j(t).
+@functools.lru_cache(maxsize=64)
+def subdivision_matrices(degree, t):
+    n = degree
+    left = np.zeros((n + 1, n + 1))
+    right = np.zeros((n + 1, n + 1))
+    for k in range(n + 1):
+        for j in range(k + 1):
+            b = math.comb(k, j) * t ** j * (1 - t) ** (k - j)
+            left[k, j] = b
+            right[n - k, n - k + j] = b
+    left.flags.writeable = False
+    right.flags.writeable = False
+    return left, right
+
+
+# Returns the first and second partial derivatives at the four corners
+# (in the order (u, v) = (0, 0), (0, 1), (1, 0), (1, 1)) of all patches
+# with the control points pts of shape (n_patches, d1 + 1, d2 + 1, 3),
+# as arrays pu, pv, puu, puv, pvv of shape (n_patches, 4, 3).
+# The derivatives at u = 1 (v = 1) are those at u = 0 (v = 0) of the
+# patch with reversed rows (columns), with the sign of the odd derivatives
+# in that direction changed.
+def corner_derivatives(pts):
+    n, r, c, dim = pts.shape
+    d1, d2 = r - 1, c - 1
+    corners = np.stack((pts, pts[:, :, ::-1], pts[:, ::-1], pts[:, ::-1, ::-1]), axis=1)
+    su = np.array([1, 1, -1, -1], dtype=float)[:, np.newaxis]
+    sv = np.array([1, -1, 1, -1], dtype=float)[:, np.newaxis]
+    p00 = corners[:, :, 0, 0]
+    p10 = corners[:, :, min(1, d1), 0]
+    p01 = corners[:, :, 0, min(1, d2)]
+    pu = d1 * (p10 - p00) * su
+    pv = d2 * (p01 - p00) * sv
+    puv = d1 * d2 * (corners[:, :, min(1, d1), min(1, d2)] - p10 - p01 + p00) * su * sv
+    puu = np.zeros_like(pu)
+    pvv = np.zeros_like(pv)
+    if d1 >= 2:
+        puu = d1 * (d1 - 1) * (corners[:, :, 2, 0] - 2 * p10 + p00)
+    if d2 >= 2:
+        pvv = d2 * (d2 - 1) * (corners[:, :, 0, 2] - 2 * p01 + p00)
+    return pu, pv, puu, puv, pvv
+
+
+# Returns the curvatures at the corners of all patches with the control
+# points pts as array of shape (n_patches, 4, 4); the last axis holds the
+# gaussian, mean, maximal and minimal principal curvature, in the order
+# of the BezierPatches.CURVATURE_* constants. All four are derived from
+# the same fundamental forms.
+def corner_curvatures(pts):
+    pu, pv, puu, puv, pvv = corner_derivatives(pts)
+    e = np.sum(pu * pu, axis=-1)
+    f = np.sum(pu * pv, axis=-1)
+    g = np.sum(pv * pv, axis=-1)
+    normal = np.cross(pu, pv)
+    length = np.linalg.norm(normal, axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normal = normal / length[..., np.newaxis]
+        l = np.sum(puu * normal, axis=-1)
+        m = np.sum(puv * normal, axis=-1)
+        n = np.sum(pvv * normal, axis=-1)
+        det = e * g - f * f
+        gaussian = (l * n - m * m) / det
+        mean = (e * n - 2 * f * m + g * l) / (2 * det)
+    # degenerate corners (eg collapsed edges at the poles of a rotation
+    # surface) have no normal; their curvature is set to 0
+    bad = ~(length > 1e-12 * (e + g))
+    gaussian[bad] = 0
+    mean[bad] = 0
+    root = np.sqrt(np.maximum(mean * mean - gaussian, 0))
+    return np.stack((gaussian, mean, mean + root, mean - root), axis=-1)
+
+
+# Worker of parallel_corner_curvatures: computes the curvatures of the
+# patches start..stop from and into shared memory
+def _curvature_worker(args):
+    name_in, name_out, shape, start, stop = args
+    shm_in = shared_memory.SharedMemory(name=name_in)
+    shm_out = shared_memory.SharedMemory(name=name_out)
+    try:
+        pts = np.ndarray(shape, dtype=float, buffer=shm_in.buf)
+        out = np.ndarray((shape[0], 4, 4), dtype=float, buffer=shm_out.buf)
+        out[start:stop] = corner_curvatures(pts[start:stop])
+        del pts, out
+    finally:
+        shm_in.close()
+        shm_out.close()
+
+
+# corner_curvatures computed by a pool of processes on slices of the
+# patches; the control points and the result are passed to the workers
+# in shared memory, so only the names of the blocks are pickled
+def parallel_corner_curvatures(pts, processes=None):
+    pts = np.ascontiguousarray(pts, dtype=float)
+    processes = processes or multiprocessing.cpu_count()
+    n = len(pts)
+    if processes <= 1 or n < 2 * processes:
+        return corner_curvatures(pts)
+    shm_in = shared_memory.SharedMemory(create=True, size=max(pts.nbytes, 1))
+    shm_out = shared_memory.SharedMemory(create=True, size=max(n * 16 * 8, 1))
+    try:
+        np.ndarray(pts.shape, dtype=float, buffer=shm_in.buf)[:] = pts
+        bounds = np.linspace(0, n, processes + 1).astype(int)
+        tasks = [(shm_in.name, shm_out.name, pts.shape, int(a), int(b))
+                 for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        with multiprocessing.Pool(processes) as pool:
+            pool.map(_curvature_worker, tasks)
+        return np.ndarray((n, 4, 4), dtype=float, buffer=shm_out.buf).copy()
+    finally:
+        shm_in.close()
+        shm_in.unlink()
+        shm_out.close()
+        shm_out.unlink()
+
+
+# Maps the curvatures k (any shape) to rgb colors (shape + (3,)):
+#   - linear: from blue (smallest value) over green to red (largest value)
+#   - cut: like linear, for the values clipped to [-cut, cut]
+#   - classification: red for positive, green for zero (|k| <= eps) and
+#     blue for negative values
+def curvature_colors(k, color_map, cut=1.0, eps=1e-6):
+    k = np.asarray(k, dtype=float)
+    if color_map == BezierPatches.COLOR_MAP_CLASSIFICATION:
+        colors = np.zeros(k.shape + (3,))
+        colors[k > eps, 0] = 1
+        colors[np.abs(k) <= eps, 1] = 1
+        colors[k < -eps, 2] = 1
+        return colors
+    if color_map == BezierPatches.COLOR_MAP_CUT:
+        lo, hi = -cut, cut
+        k = np.clip(k, lo, hi)
+    else:
+        lo, hi = (k.min(), k.max()) if k.size else (0, 0)
+    t = (k - lo) / (hi - lo) if hi > lo else np.full(k.shape, 0.5)
+    red = np.clip(2 * t - 1, 0, 1)
+    blue = np.clip(1 - 2 * t, 0, 1)
+    return np.stack((red, 1 - red - blue, blue), axis=-1)
 
 
 class BezierCurve:
+    # From this number of parameters on, evaluate_many uses the
+    # Bernstein matrix instead of the de Casteljau scheme
+    BERNSTEIN_SAMPLES = 32
+
     def __init__(self, degree):
         assert degree >= 0
         self.degree = degree
@@ -44,6 +199,12 @@ class BezierCurve:
     def _de_casteljau(self, t, stop):
         assert (stop >= 1)
         column = self.control_points
+        if isinstance(column, PointArray):
+            # whole columns at once on the coordinate array
+            c = column.data
+            while len(c) > stop:
+                c = (1 - t) * c[:-1] + t * c[1:]
+            return list(PointArray(c))
         while len(column) > stop:
             new_column = [None for i in range(len(column) - 1)]
             for i in range(len(new_column)):
@@ -51,6 +212,54 @@ class BezierCurve:
             column = new_column
         return column
 
+    # Evaluates the curve at all parameters in ts at once
+    # Returns the points as PointArray
+    def evaluate_many(self, ts):
+        ts = np.asarray(ts, dtype=float).ravel()
+        pts = to_array(self.control_points)
+        if len(ts) >= self.BERNSTEIN_SAMPLES:
+            return PointArray(self.bernstein_matrix(ts) @ pts)
+        # de Casteljau scheme for all parameters, one level at a time
+        t = ts[:, np.newaxis, np.newaxis]
+        column = np.broadcast_to(pts, (len(ts),) + pts.shape)
+        while column.shape[1] > 1:
+            column = (1 - t) * column[:, :-1] + t * column[:, 1:]
+        return PointArray(column[:, 0])
+
+    # Returns the matrix of the Bernstein polynomials B_j(t) of the curve's
+    # degree, with one row per parameter in ts and one column per j
+    def bernstein_matrix(self, ts):
+        n = self.degree
+        ts = np.asarray(ts, dtype=float).ravel()[:, np.newaxis]
+        j = np.arange(n + 1)
+        binom = np.array([math.comb(n, k) for k in j], dtype=float)
+        return binom * ts ** j * (1 - ts) ** (n - j)
+
+    # Splits the curve at t into two curves for [0, t] and [t, 1]
+    # Both control polygons are the two outer edges of a single
+    # de Casteljau pyramid
+    def subdivide(self, t):
+        n = self.degree
+        column = to_array(self.control_points)
+        left = np.empty_like(column)
+        right = np.empty_like(column)
+        left[0] = column[0]
+        right[n] = column[n]
+        for k in range(1, n + 1):
+            column = (1 - t) * column[:-1] + t * column[1:]
+            left[k] = column[0]
+            right[n - k] = column[-1]
+        curves = []
+        for pts in (left, right):
+            curve = BezierCurve(n)
+            curve.color = self.color
+            if isinstance(self.control_points, PointArray):
+                curve.control_points = PointArray(pts)
+            else:
+                curve.control_points = PointArray(pts).to_list()
+            curves.append(curve)
+        return curves[0], curves[1]
+
     def get_color(self):
         return self.color
 
@@ -62,6 +271,8 @@ class BezierCurve:
         pass
 
     def get_axis_aligned_bounding_box(self):
+        if isinstance(self.control_points, PointArray):
+            return self.control_points.get_axis_aligned_bounding_box()
         min_vec = copy.copy(self.control_points[0])
         max_vec = copy.copy(self.control_points[0])
         for p in self.control_points:
@@ -75,13 +286,13 @@ class BezierCurve:
                 max_vec.y = p.y
         return min_vec, max_vec
 
+    # Draws the curve as single polyline; without a fixed num_samples the
+    # number of samples is chosen by the scene from the flatness of the
+    # control polygon
     def draw(self, scene, num_samples):
-        p0 = self(0)
-        for i in range(1, num_samples + 1):
-            t = i / num_samples
-            p1 = self(t)
-            scene.draw_line(p0, p1, self.color)
-            p0 = p1
+        ctrl = to_array(self.control_points)
+        num = int(scene.sample_counts(ctrl[np.newaxis], self.degree, num_samples)[0])
+        scene.draw_polyline(self.evaluate_many(np.arange(num + 1) / num), self.color)
 
     def get_polyline_from_control_points(self):
         pl = Polyline()
@@ -132,33 +343,18 @@ class BezierSurface:
 
     def _de_casteljau(self, t1, t2, stop):
         s1, s2 = stop
-        d1, d2 = self.degree
         assert (s1 >= 1 and s2 >= 1)
-        d1 += 1  # number of control points in each direction
-        d2 += 1
-
-        # Apply the de Casteljau scheme in one direction,
-        # ie, reduce dimension from (d1, d2) to (s1, d2)
-        column = self.control_points
-        while d1 > s1:
-            d1 -= 1
-            new_column = [[None for i in range(d2)] for j in range(d1)]
-            for i in range(d1):
-                for j in range(d2):
-                    new_column[i][j] = (1 - t1) * column[i][j] + t1 * column[i + 1][j]
-            column = new_column
 
-        # Apply the de Casteljau scheme in the other direction,
-        # ie, reduce dimension from (s1, d2) to (s1, s2)
-        while d2 > s2:
-            d2 -= 1
-            new_column = [[None for i in range(d2)] for j in range(d1)]
-            for i in range(d1):
-                for j in range(d2):
-                    new_column[i][j] = (1 - t2) * column[i][j] + t2 * column[i][j + 1]
-            column = new_column
-
-        return column
+        # Apply the de Casteljau scheme in one direction, ie, reduce
+        # dimension from (d1, d2) to (s1, d2), then in the other direction
+        # from (s1, d2) to (s1, s2); each step reduces whole rows or columns
+        # of the coordinate array
+        c = to_array(self.control_points)
+        while len(c) > s1:
+            c = (1 - t1) * c[:-1] + t1 * c[1:]
+        while c.shape[1] > s2:
+            c = (1 - t2) * c[:, :-1] + t2 * c[:, 1:]
+        return PointArray(c).to_list()
 
     def normal(self, t1, t2):
         pass
@@ -172,26 +368,29 @@ class BezierSurface:
         b10, b11 = b1._subdivide_v(t2)
         return [b00, b01, b10, b11]
 
+    # Both halves are the products of the subdivision matrices with all
+    # columns (u) or rows (v) of the control points at once
     def _subdivide_u(self, t):
-        du, dv = self.degree
-        left = BezierSurface((du, dv))
-        right = BezierSurface((du, dv))
-        for k in range(du + 1):
-            pts = self._de_casteljau(t, 0, (du - k + 1, dv + 1))
-            left.control_points[k] = pts[0]
-            right.control_points[-(k + 1)] = pts[-1]
-        return left, right
+        left, right = subdivision_matrices(self.degree[0], t)
+        pts = to_array(self.control_points)
+        return (self._with_control_points(np.einsum('ij,jkc->ikc', left, pts)),
+                self._with_control_points(np.einsum('ij,jkc->ikc', right, pts)))
 
     def _subdivide_v(self, t):
-        du, dv = self.degree
-        left = BezierSurface((du, dv))
-        right = BezierSurface((du, dv))
-        for k in range(dv + 1):
-            pts = self._de_casteljau(0, t, (du + 1, dv - k + 1))
-            for i in range(du + 1):
-                left.control_points[i][k] = pts[i][0]
-                right.control_points[i][-(k + 1)] = pts[i][-1]
-        return left, right
+        left, right = subdivision_matrices(self.degree[1], t)
+        pts = to_array(self.control_points)
+        return (self._with_control_points(np.einsum('ij,kjc->kic', left, pts)),
+                self._with_control_points(np.einsum('ij,kjc->kic', right, pts)))
+
+    # New surface of the same degree with the control point array pts,
+    # stored like the control points of this surface
+    def _with_control_points(self, pts):
+        surface = BezierSurface(self.degree)
+        if isinstance(self.control_points, PointArray):
+            surface.control_points = PointArray(pts)
+        else:
+            surface.control_points = PointArray(pts).to_list()
+        return surface
 
 
 class BezierPatches:
@@ -202,12 +401,86 @@ class BezierPatches:
     COLOR_MAP_LINEAR = 4
     COLOR_MAP_CUT = 5
     COLOR_MAP_CLASSIFICATION = 6
-
+    CUT_RANGE = 1.0  # COLOR_MAP_CUT clips the curvatures to [-CUT_RANGE, CUT_RANGE]
+    CLASSIFICATION_EPS = 1e-6  # COLOR_MAP_CLASSIFICATION treats |k| <= eps as 0
+
+    # The patches are either kept as list of BezierSurface objects, or as
+    # array of the control points of all patches, of shape
+    # (n_patches, d1 + 1, d2 + 1, 3), together with an array of the corner
+    # colors of shape (n_patches, 4, 3) and corner curvatures of shape
+    # (n_patches, 4). Refining works on the array; the
+    # BezierSurface objects are only created when single patches are
+    # accessed, which turns the patches back into a list.
     def __init__(self):
-        self.patches = []
+        self._patches = []
+        self._points = None
+        self._colors = None
+        self._curvature = None
+        self._curvatures = None
+
+    # Creates patches from the array of the control points of all patches
+    # and optionally the array of their corner colors (default white)
+    @classmethod
+    def from_array(cls, points, colors=None):
+        patches = cls()
+        patches._patches = None
+        patches._points = np.asarray(points, dtype=float)
+        assert patches._points.ndim == 4
+        if colors is None:
+            colors = np.ones((len(patches._points), 4, 3))
+        patches._colors = np.asarray(colors, dtype=float)
+        patches._curvature = np.full((len(patches._points), 4), np.nan)
+        return patches
+
+    @property
+    def patches(self):
+        if self._patches is None:
+            self._materialize()
+        return self._patches
+
+    @patches.setter
+    def patches(self, patches):
+        self._patches = list(patches)
+        self._points = None
+        self._colors = None
+        self._curvature = None
+        self._curvatures = None
+
+    def _materialize(self):
+        patches = []
+        for pts, colors, k in zip(self._points, self._colors, self._curvature):
+            patch = BezierSurface((pts.shape[0] - 1, pts.shape[1] - 1))
+            patch.control_points = PointArray(pts)
+            patch.set_colors(*[tuple(c) for c in colors.tolist()])
+            if not np.isnan(k).any():
+                patch.set_curvature(*k.tolist())
+            patches.append(patch)
+        self.patches = patches
+
+    # True if the patches are kept as array
+    def is_array(self):
+        return self._patches is None
+
+    # Returns the control points of all patches as array of shape
+    # (n_patches, d1 + 1, d2 + 1, 3); all patches need the same degree
+    def as_array(self):
+        if self._patches is None:
+            return self._points
+        if len(self._patches) == 0:
+            return np.zeros((0, 4, 4, 3))
+        return np.array([to_array(p.control_points) for p in self._patches])
+
+    # Returns the corner colors of all patches as array of shape
+    # (n_patches, 4, 3), in the order of BezierSurface.color
+    def colors_as_array(self):
+        if self._patches is None:
+            return self._colors
+        return np.array([p.color for p in self._patches], dtype=float).reshape(-1, 4, 3)
 
     def __len__(self):
-        return len(self.patches)
+        if self._patches is None:
+            return len(self._points)
+        return len(self._patches)
 
     def __getitem__(self, p):
         return self.patches[p]
@@ -226,102 +499,146 @@ class BezierPatches:
 
     # Refines patches by subdividing each patch into four new patches
     # There are 4^num times more patches after calling this function
+    # All patches are subdivided at once by products with the
+    # subdivision matrices; the new patches are kept as array, in the
+    # order of BezierSurface.subdivide, with white corners
     def refine(self, num):
+        if num <= 0 or len(self) == 0:
+            return
+        if self._patches is not None and len({p.degree for p in self._patches}) > 1:
+            for i in range(num):
+                new_patches = []
+                for p in self._patches:
+                    new_patches.extend(p.subdivide(0.5, 0.5))
+                self.patches = new_patches
+            return
+        pts = self.as_array()
+        n, d1, d2, dim = pts.shape
+        lu, ru = subdivision_matrices(d1 - 1, 0.5)
+        lv, rv = subdivision_matrices(d2 - 1, 0.5)
+        su = np.stack((lu, ru))             # (2, d1, d1)
+        sv = np.stack((lv, rv))             # (2, d2, d2)
         for i in range(num):
-            new_patches = BezierPatches()
-            for p in self:
-                new = p.subdivide(0.5, 0.5)
-                for n in new:
-                    new_patches.append(n)
-            self.patches = new_patches
-
-    def visualize_curvature(self, curvature_mode, color_map):
-        # Calculate curvatures at each corner point
-        # Set colors according to color map
-        pass
-
-    def export_off(self):
-        def export_point(p):
-            return str(p.x) + " " + str(p.y) + " " + str(p.z)
-
-        def export_colors(c):
-            s = ""
-            for x in c:
-                s += str(x)
-                s += " "
-            s += "1"  # opacity
-            return s
-
-        s = "CBEZ333\n"
-        for patch in self:
-            # coordinates
-            for row in patch.control_points:
-                for point in row:
-                    s += export_point(point)
-                    s += "\n"
-
-            # colors
-            s += export_colors(patch.color[0])
-            s += "\n"
-            s += export_colors(patch.color[2])
-            s += "\n"
-            s += export_colors(patch.color[1])
-            s += "\n"
-            s += export_colors(patch.color[3])
-            s += "\n"
-            s += "\n"
-
-        return s
-
-    def export_standard_off(self):
-        def export_numbers(degree):
-            d1, d2 = degree
-            n_v = (d1 + 1) * (d2 + 1)
-            n_f = d1 * d2
+            # new patch (p, a, b) is S_u[a] @ P_p @ S_v[b]^T
+            pts = np.einsum('aij,pjkc,blk->pabilc', su, pts, sv, optimize=True)
+            pts = pts.reshape(-1, d1, d2, dim)
+        self._patches = None
+        self._points = np.ascontiguousarray(pts)
+        self._colors = np.ones((len(pts), 4, 3))
+        self._curvature = np.full((len(pts), 4), np.nan)
+        self._curvatures = None
+
+    # Returns the curvatures at the corners of all patches as array of
+    # shape (n_patches, 4, 4), see corner_curvatures; with processes > 1
+    # they are computed in parallel. The result is kept as long as the
+    # patches are kept as array.
+    def curvatures(self, processes=None):
+        if self._patches is None and self._curvatures is not None:
+            return self._curvatures
+        pts = self.as_array()
+        if processes is not None and processes > 1:
+            k = parallel_corner_curvatures(pts, processes)
+        else:
+            k = corner_curvatures(pts)
+        if self._patches is None:
+            self._curvatures = k
+        return k
+
+    # Calculates the curvatures at the corners of all patches and sets the
+    # corner colors according to the color map
+    def visualize_curvature(self, curvature_mode, color_map, processes=None):
+        assert curvature_mode in (self.CURVATURE_GAUSSIAN, self.CURVATURE_AVERAGE,
+                                  self.CURVATURE_PRINCIPAL_MAX, self.CURVATURE_PRINCIPAL_MIN)
+        k = self.curvatures(processes)[:, :, curvature_mode]
+        colors = curvature_colors(k, color_map, self.CUT_RANGE, self.CLASSIFICATION_EPS)
+        if self._patches is None:
+            self._colors = colors
+            self._curvature = k
+        else:
+            for patch, c, v in zip(self._patches, colors.tolist(), k.tolist()):
+                patch.set_colors(*[tuple(x) for x in c])
+                patch.set_curvature(*v)
+
+    # Returns the quads of the control polygons of all patches as array of
+    # indices into as_array().reshape(-1, 3), and the number of quads
+    # per patch
+    def _quad_faces(self):
+        n, r, c = self.as_array().shape[:3]
+        first = (np.arange(r - 1)[:, np.newaxis] * c + np.arange(c - 1)).ravel()
+        quad = np.stack((first, first + 1, first + 1 + c, first + c), axis=1)
+        return (quad + (r * c * np.arange(n))[:, np.newaxis, np.newaxis]).reshape(-1, 4), len(quad)
+
+    # Coordinates of the control points (n_patches, 3 * (d1 + 1) * (d2 + 1))
+    # and corner colors in the order c00, c10, c01, c11 (n_patches, 12) of
+    # all patches as object arrays, such that %s writes every value as str()
+    # does, like the exports always did: patches kept as list keep the
+    # types of their values; for patches kept as array, integral colors
+    # are written as ints, like the default white (1, 1, 1).
+    def _export_values(self):
+        if self._patches is None:
+            n = len(self._points)
+            pts = self._points.reshape(n, -1).tolist()
+            colors = [[int(x) if x.is_integer() else x for x in c]
+                      for c in self._colors[:, [0, 2, 1, 3]].reshape(n, -1).tolist()]
+        else:
+            pts = [[x for row in p.control_points for q in row for x in (q.x, q.y, q.z)] for p in self._patches]
+            colors = [[x for i in (0, 2, 1, 3) for x in p.color[i]] for p in self._patches]
+        return np.array(pts, dtype=object), np.array(colors, dtype=object)
+
+    # Writes the exports to the file or path f and returns None, or
+    # returns them as string if f is None
+    def _export(self, f, write):
+        if f is None:
+            out = io.StringIO()
+            write(out)
+            return out.getvalue()
+        if not hasattr(f, "write"):
+            with meshwriter.open_mesh_file(f) as fo:
+                write(fo)
+        else:
+            write(f)
+
+    # Exports the control points and corner colors of all patches
+    # (bicubic patches only) in the CBEZ333 format of geomview
+    def export_off(self, f=None):
+        def write(fo):
+            pts, colors = self._export_values()
+            fo.write("CBEZ333\n")
+            fmt = "%s %s %s\n" * 16 + "%s %s %s 1\n" * 4 + "\n"
+            meshwriter.write_rows(fo, fmt, np.hstack((pts, colors)))
+
+        return self._export(f, write)
+
+    # Exports the control polygons of all patches as quad mesh in the OFF
+    # format, each face colored by the average of the corner colors
+    def export_standard_off(self, f=None):
+        def write(fo):
+            pts = self.as_array()
+            n, r, c, dim = pts.shape
+            d1, d2 = r - 1, c - 1
             n_e = d1 * (d2 + 1) + d2 * (d1 + 1)
-            patch_num = len(self)
-            return str(n_v * patch_num) + " " + str(n_f * patch_num) + " " + str(n_e * patch_num) + "\n"
-
-        def export_vertex(v):
-            return str(v.x) + " " + str(v.y) + " " + str(v.z) + "\n"
-
-        def export_face(f_vs):
-            s = "4  "
-            for f_v in f_vs:
-                s += str(f_v)
-                s += " "
-            return s
-
-        def avg_color(f_cs):
-            avg_f_c = [0, 0, 0]
-            for f_c in f_cs:
-                avg_f_c[0] += f_c[0]
-                avg_f_c[1] += f_c[1]
-                avg_f_c[2] += f_c[2]
-            return (round(255 * avg_f_c[0] / 4),
-                    round(255 * avg_f_c[1] / 4),
-                    round(255 * avg_f_c[2] / 4))
-
-        def export_color(f_c):
-            return " " + str(f_c[0]) + " " + str(f_c[1]) + " " + str(f_c[2]) + "\n"
-
-        s = "OFF\n\n"
-        s += export_numbers(self[0].degree)
-
-        for patch in self:
-            for v_row in patch.control_points:
-                for vertex in v_row:
-                    s += export_vertex(vertex)
-        start_v = 0
-        for patch in self:
-            cps = patch.control_points
-            row_num = len(cps)
-            col_num = len(cps[0])
-            for row in range(row_num - 1):
-                for col in range(col_num - 1):
-                    first_v = start_v + row * col_num + col
-                    f_vertices = (first_v, first_v + 1, first_v + 1 + col_num, first_v + col_num)
-                    s += export_face(f_vertices)
-                    s += export_color(avg_color(patch.color))
-            start_v += 16
-        return s
+            faces, per_patch = self._quad_faces()
+            colors = np.round(255 * self.colors_as_array().sum(axis=1) / 4).astype(np.int64)
+            colors = np.repeat(colors, per_patch, axis=0)
+            fo.write("OFF\n\n")
+            fo.write("%d %d %d\n" % (n * r * c, n * d1 * d2, n * n_e))
+            meshwriter.write_rows(fo, "%s %s %s\n", self._export_values()[0].reshape(-1, dim))
+            meshwriter.write_rows(fo, "4  %d %d %d %d  %d %d %d\n", np.hstack((faces, colors)))
+
+        return self._export(f, write)
+
+    # Writes the control polygons of all patches as quad mesh with face
+    # colors to path, in the format given by its extension
+    # (.off, .obj or .ply, optionally .gz compressed; see meshwriter)
+    def export_mesh(self, path):
+        vertices, faces, colors = self.quad_mesh()
+        meshwriter.write_mesh(path, vertices, faces, face_colors=colors)
+
+    # Returns the control polygons of all patches as quad mesh: vertices
+    # (n, 3), quads (m, 4) and the face colors (m, 3), the average of the
+    # corner colors of the patch
+    def quad_mesh(self):
+        pts = self.as_array()
+        faces, per_patch = self._quad_faces()
+        colors = np.repeat(self.colors_as_array().mean(axis=1), per_patch, axis=0)
+        return pts.reshape(-1, pts.shape[-1]), faces, colors
@@ -4,7 +4,6 @@ from cagd.spline import Spline, SplineSurface, Knots
 from cagd.bezier import BezierSurface, BezierPatches
 from cagd.vec import Vec2, Vec3
 from cagd.viewer3d import Viewer3d
-import multiprocessing
 import os
 
 # if True only show a single object otherwise show all objects
@@ -13,12 +12,6 @@ show_single = True
 figure = False
 
 
-# parallel compute curvature visualization
-def visualize_curvature(patches):
-    patches[0].visualize_curvature(patches[1], patches[2])
-    return patches
-
-
 def get_surface():
     if figure:
         pts = [Vec2(0.05, 5.5),
@@ -73,23 +66,15 @@ if __name__ == "__main__":
         v.add_text("                                        CURVATURE_GAUSSIAN          CURVATURE_AVERAGE          CURVATURE_PRINCIPAL_MAX          CURVATURE_PRINCIPAL_MIN \
             \n\n\n\n\n\n\n\nCOLOR_MAP_LINEAR\n\n\n\n\n\n\n\nCOLOR_MAP_CUT\n\n\n\n\n\n\n\nCOLOR_MAP_CLASSIFICATION")
 
-        threads = []
-        bpatches = []
-        indexes = []
-        inputData = []
+        # the curvatures of all patches are computed once, in parallel on
+        # shared memory; each combination only maps them to colors
+        bezier_patches.curvatures(processes=os.cpu_count())
         for i in range(4):
             for j in range(4, 7):
-                inputData.append((bezier_patches, i, j))
-
-        p = multiprocessing.Pool(os.cpu_count())
-        data = p.map(visualize_curvature, inputData)
-
-        for di in data:
-            i = di[1]
-            j = di[2]
-            v.display_object(di[0], Vec3(-10 * i + 10 * j, 10 * i + 10 * j, 0))
+                bezier_patches.visualize_curvature(i, j)
+                colored = BezierPatches.from_array(bezier_patches.as_array(), bezier_patches.colors_as_array())
+                v.display_object(colored, Vec3(-10 * i + 10 * j, 10 * i + 10 * j, 0))
 
-        p.close()
         v.show()
 
     else:
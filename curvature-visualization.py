@@ -30,6 +30,4 @@ bezier_patches.refine(1)  # refine surface into more patches for more detailed c
 bezier_patches.visualize_curvature(bezier_patches.CURVATURE_GAUSSIAN, bezier_patches.COLOR_MAP_LINEAR)
 
 path = "surfaces.off"
-f = open(path, 'w')
-f.write(bezier_patches.export_standard_off())
-f.close()
+bezier_patches.export_standard_off(path)
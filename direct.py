@@ -14,11 +14,11 @@
 import argparse
 import os.path
 import sys
-import json
 import math
 import numpy
 import time
 import itertools
+import tsm_distance
 import tsm_plot
 
 
@@ -71,7 +71,13 @@ def main():
     # parse command line arguments
     print("")
     parser = argparse.ArgumentParser()
-    parser.add_argument("infile", help="input file with TSM problem as json")
+    parser.add_argument("infile", help="input file with TSM problem as json or .npy")
+    parser.add_argument("--cache", action="store_true", default=None,
+                        help="cache the distance matrix on disk (default: environment variable TSM_CACHE=1)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the plot of the tour to this file (png, svg, ...) instead of showing it")
+    parser.add_argument("--decimate", type=int, default=1,
+                        help="only plot every k-th city of the tour (with --output)")
     args = parser.parse_args()
     prog = os.path.basename(__file__)
     infile = args.infile
@@ -80,11 +86,10 @@ def main():
     # read problem from input file
     cities = []
     try:
-        with open(infile, "r") as f : 
-            cities = json.load(f)
-            count  = len(cities)
-    except:
-        print(f"{prog}: error: input file corrupted or invalid json data")
+        cities = tsm_distance.read(infile)
+        count  = len(cities)
+    except (OSError, ValueError):
+        print(f"{prog}: error: input file corrupted or invalid json or .npy data")
     print(f"   + found TSM problem with N={count} cities") 
     
     # refuse to run problem if too complex (N = 14 will run about 6h, 
@@ -93,18 +98,12 @@ def main():
         print(f"   + problem too complex")
         print(f"{prog}: error: problems of size > 14 cannot be solved by the direct method")
         print(f"{prog}: error: in a reasonable time (less than a day of CPU time)")
+        print(f"{prog}: error: use heldkarp.py for exact solutions up to N = 23")
         sys.exit()
         
     # create distance matrix
     print(f"   + setting up distance matrix")
-    distance = numpy.zeros((count,count))
-    for i in range(count) :
-        for k in range(count) :
-            a = cities[i]
-            b = cities[k]
-            d0 = a[0]-b[0]
-            d1 = a[1]-b[1]
-            distance[i, k] = math.sqrt(d0*d0 + d1*d1)
+    distance = tsm_distance.load(infile, cities, cache=args.cache)
             
     # do computation, take timings
     print(f"   + starting calculation, this may take some time ... ")
@@ -137,7 +136,11 @@ def main():
     
     # plot solution
     print("")
-    tsm_plot.plot(cities,sol)
+    if args.output :
+        print(f"   + writing plot to '{args.output}'")
+        tsm_plot.save(cities, sol, args.output, args.decimate)
+    else :
+        tsm_plot.plot(cities,sol)
     return 
 
 
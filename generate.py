@@ -13,12 +13,105 @@
 
 import argparse
 import os.path
-import random
 import sys
-import json
 import math
+import numpy as np
 
 
+# --------------------------------------------------------------------------
+# Global parameters
+# --------------------------------------------------------------------------
+
+g_mindist  = 0.01             # minimal distance between two cities
+g_border   = 0.01             # cities are placed in [g_border, 1-g_border]^2
+g_coverage = 0.2              # maximal fraction of the square covered by
+                              # disks of diameter mindist around the cities
+g_batch    = 4096             # random candidates drawn at once
+g_chunk    = 65536            # cities formatted at once when writing json
+
+
+# --------------------------------------------------------------------------
+# creation and output of TSM problems
+# --------------------------------------------------------------------------
+
+# Default minimal distance for 'count' cities: g_mindist, reduced for large
+# problems such that the square stays filled to at most g_coverage. Close 
+# to the jamming limit (about 0.55) rejection sampling stalls.
+def default_mindist(count):
+    area = (1 - 2*g_border)**2
+    return min(g_mindist, math.sqrt(4 * g_coverage * area / (math.pi * max(count, 1))))
+
+
+# Create 'count' random city locations as count x 2 array. Each location is 
+# drawn uniformly from [g_border, 1-g_border]^2 and only accepted if its 
+# distance from all other cities is at least 'mindist'.
+# The accepted cities are hashed into a grid of cells with diagonal mindist,
+# i.e. each cell holds at most one city, and a candidate only has to be 
+# checked against the cities in the 5 x 5 cells around its own cell.
+# With the same 'seed', the same problem is created.
+def create(count, mindist=None, seed=None):
+    if mindist is None :
+        mindist = default_mindist(count)
+    lo = g_border
+    hi = 1 - g_border
+    area = (hi - lo)**2
+    # refuse a coverage close to the jamming limit
+    if count > 0 and mindist > 0 and count * math.pi * mindist * mindist / 4 > 0.5 * area :
+        raise ValueError("generate: too many cities for the minimal distance")
+    rng = np.random.default_rng(seed)
+    cities = np.empty((count, 2))
+    if mindist <= 0 :
+        cities[:] = rng.uniform(lo, hi, (count, 2))
+        return cities
+    h = mindist / math.sqrt(2)
+    g = int(math.ceil((hi - lo) / h))
+    grid = [-1] * (g * g)
+    md2 = mindist * mindist
+    xs = []
+    ys = []
+    while len(xs) < count :
+        for x, y in rng.uniform(lo, hi, (g_batch, 2)).tolist() :
+            cx = min(int((x - lo) / h), g - 1)
+            cy = min(int((y - lo) / h), g - 1)
+            succ = True
+            for i in range(max(cx - 2, 0), min(cx + 3, g)) :
+                for c in grid[i*g + max(cy - 2, 0) : i*g + min(cy + 3, g)] :
+                    if c >= 0 :
+                        d1 = xs[c] - x
+                        d2 = ys[c] - y
+                        if d1*d1 + d2*d2 < md2 :
+                            succ = False
+                            break
+                if not succ :
+                    break
+            if succ :
+                grid[cx * g + cy] = len(xs)
+                xs.append(x)
+                ys.append(y)
+                if len(xs) == count :
+                    break
+    cities[:, 0] = xs
+    cities[:, 1] = ys
+    return cities
+
+
+# Write the cities to outfile: binary as count x 2 array if the file name
+# ends with '.npy', otherwise as json list of [x,y] pairs. The json text is
+# written in chunks of g_chunk cities, so the whole file is never held in
+# memory as string or as list of Python objects.
+def write(cities, outfile):
+    if outfile.endswith(".npy") :
+        np.save(outfile, np.asarray(cities, dtype=np.float64))
+        return
+    count = len(cities)
+    with open(outfile, 'w') as f:
+        f.write("[\n")
+        for a in range(0, count, g_chunk) :
+            b = min(a + g_chunk, count)
+            f.write(",\n".join(f"  [{x!r}, {y!r}]" for x, y in np.asarray(cities[a:b]).tolist()))
+            f.write(",\n" if b < count else "\n")
+        f.write("]\n")
+
 
 # --------------------------------------------------------------------------
 # the main entry point
@@ -28,7 +121,11 @@ def main():
     # parse command line arguments
     parser = argparse.ArgumentParser()
     parser.add_argument("count", help="the number of cities in the TSM problem")
-    parser.add_argument("outfile", help="file in which to store the TSM description")
+    parser.add_argument("outfile", help="file in which to store the TSM description (json, or binary if it ends with '.npy')")
+    parser.add_argument("-s", "--seed", type=int, default=None,
+                        help="seed of the random generator, for reproducible problems")
+    parser.add_argument("-m", "--mindist", type=float, default=None,
+                        help=f"minimal distance between two cities (default {g_mindist}, smaller for large problems)")
     args = parser.parse_args()
     prog = os.path.basename(__file__)
     outfile = args.outfile
@@ -43,40 +140,29 @@ def main():
     if os.path.exists(outfile):
         print(f"{prog}: error: output file '{outfile}' exists")
         sys.exit()
-    print(f"   + command line: count = {count}, outfile = '{outfile}'") 
+    mindist = args.mindist if args.mindist is not None else default_mindist(count)
+    print(f"   + command line: count = {count}, outfile = '{outfile}', seed = {args.seed}") 
     
     # create 'count' city locations and store them in an array
     # each location is a 2-tuple of x and y coordinate from 
     # the range [0,1]. To avoid (near) duplicates, a new city
     # is only accepted if its distance from all other cities
-    # is at least 0.01.
+    # is at least 'mindist' (see create()).
     #
     # NOTE: TSM is scale invariant, i.e. scaling the unit length
     #       by a factor k does not affect the solution, and only
     #       scales the minimal length by the factor k. We thus
     #       restrict the x and y coordinates to the unit square.
-    print(f"   + creating random TSM problem of size {count}")
-    cities = []
-    num  = 0
-    while num < count : 
-        x = random.uniform(0.01, 0.99)
-        y = random.uniform(0.01, 0.99)
-        succ = True
-        for c in cities :
-            d1 = c[0] - x;
-            d2 = c[1] - y;
-            d = math.sqrt(d1*d1 + d2*d2)
-            if d < 0.01 : 
-                succ = False
-                break
-        if succ :
-            cities.append((x,y))
-            num += 1
+    print(f"   + creating random TSM problem of size {count}, minimal distance {mindist}")
+    try:
+        cities = create(count, mindist, args.seed)
+    except ValueError:
+        print(f"{prog}: error: {count} cities do not fit into the unit square at distance {mindist}")
+        sys.exit()
     
-    # dump the array of city locations to the json output file
+    # dump the array of city locations to the output file
     print(f"   + writing TSM data to output file '{outfile}'")
-    with open(outfile, 'w') as f:
-        json.dump(cities, f, indent=2)
+    write(cities, outfile)
         
     # all done
     print("   + all done")
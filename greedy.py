@@ -14,11 +14,13 @@
 import argparse
 import os.path
 import sys
-import json
 import math
 import numpy
 import time
 import itertools
+import tsm_distance
+import tsm_localsearch
+import tsm_neighbors
 import tsm_plot
 
 
@@ -48,10 +50,15 @@ def measure(perm, distance) :
 # The result is a tour [0,....] starting at 0 but *not* including the final 0
 # (this will be added in the main routine below). The returned distance will
 # include the last piece back to 0.
-def compute(distance):    
+# If candidate lists of nearest neighbors are given (see tsm_neighbors), the
+# next city is the first non-visited candidate; only if all candidates have
+# been visited, all remaining cities are scanned.
+def compute(distance, neighbors=None):    
     count, cols = numpy.shape(distance)
     if cols != count :
         raise ValueError
+    if neighbors is not None :
+        return compute_candidates(distance, neighbors)
     pool = set(range(1, count))
     sol  = [0]
     num  = 1
@@ -75,6 +82,35 @@ def compute(distance):
     dist += distance[sol[-1], 0]
     # return solution
     return sol, dist
+
+
+# compute() restricted to the candidate lists of nearest neighbors
+def compute_candidates(distance, neighbors):
+    count = len(distance)
+    visited = numpy.zeros(count, dtype=bool)
+    visited[0] = True
+    sol  = [0]
+    cur  = 0
+    dist = 0
+    for num in range(1, count) : 
+        # first non-visited candidate, the candidates are sorted by distance
+        next = -1
+        for city in neighbors[cur] :
+            if not visited[city] :
+                next = city
+                break
+        if next < 0 :
+            # fall back to a full scan over the non-visited cities
+            next = numpy.argmin(numpy.where(visited, numpy.inf, distance[cur]))
+        # update solution
+        dist += distance[cur, next]
+        sol.append(int(next))
+        visited[next] = True
+        cur = next
+    # add last segment back to 0 to the total distance
+    dist += distance[sol[-1], 0]
+    # return solution
+    return sol, dist
     
     
 # --------------------------------------------------------------------------
@@ -85,7 +121,17 @@ def main():
     # parse command line arguments
     print("")
     parser = argparse.ArgumentParser()
-    parser.add_argument("infile", help="input file with TSM problem as json")
+    parser.add_argument("infile", help="input file with TSM problem as json or .npy")
+    parser.add_argument("--cache", action="store_true", default=None,
+                        help="cache the distance matrix on disk (default: environment variable TSM_CACHE=1)")
+    parser.add_argument("-k", "--neighbors", type=int, default=0,
+                        help="restrict the search to the k nearest neighbors (default 0: all cities)")
+    parser.add_argument("-O", "--optimize", action="store_true",
+                        help="post-optimize the tour by local search (2-opt, Or-opt)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the plot of the tour to this file (png, svg, ...) instead of showing it")
+    parser.add_argument("--decimate", type=int, default=1,
+                        help="only plot every k-th city of the tour (with --output)")
     args = parser.parse_args()
     prog = os.path.basename(__file__)
     infile = args.infile
@@ -94,34 +140,42 @@ def main():
     # read problem from input file
     cities = []
     try:
-        with open(infile, "r") as f : 
-            cities = json.load(f)
-            count  = len(cities)
-    except:
-        print(f"{prog}: error: input file corrupted or invalid json data")
+        cities = tsm_distance.read(infile)
+        count  = len(cities)
+    except (OSError, ValueError):
+        print(f"{prog}: error: input file corrupted or invalid json or .npy data")
     print(f"   + found TSM problem with N={count} cities") 
         
     # create distance matrix
     print(f"   + setting up distance matrix")
-    distance = numpy.zeros((count,count))
-    for i in range(count) :
-        for k in range(count) :
-            a = cities[i]
-            b = cities[k]
-            d0 = a[0]-b[0]
-            d1 = a[1]-b[1]
-            distance[i, k] = math.sqrt(d0*d0 + d1*d1)
+    distance = tsm_distance.load(infile, cities, cache=args.cache)
+    neighbors = None
+    if args.neighbors > 0 :
+        print(f"   + setting up lists of {args.neighbors} nearest neighbors")
+        neighbors = tsm_neighbors.candidates(cities, args.neighbors)
+    if args.optimize and neighbors is None :
+        print(f"   + setting up lists of {tsm_localsearch.g_neighbors} nearest neighbors for the local search")
+        lsneighbors = tsm_neighbors.candidates(cities, tsm_localsearch.g_neighbors)
+    else :
+        lsneighbors = neighbors
             
     # do computation, take timings
     print(f"   + starting calculation, this may take some time ... ")
     try:
         start = time.perf_counter()
-        sol, res = compute(distance)  
+        sol, res = compute(distance, neighbors)  
+        found = res
+        if args.optimize :
+            sol, res = tsm_localsearch.optimize(sol, distance, lsneighbors)
+            i = sol.index(0)
+            sol = sol[i:] + sol[:i]
         stop = time.perf_counter()
     except:
         print(f"{prog}: error: internal error in main computation")
         sys.exit()
     print(f"   + finished calculation")
+    if args.optimize :
+        print(f"   + local search improved the length from {found} to {res}")
     
     # prepare solution for display:
     #   - cycle such that city #0 is in slot 0  [automatically ensured by program]
@@ -143,7 +197,11 @@ def main():
     
     # plot solution
     print("")
-    tsm_plot.plot(cities,sol)
+    if args.output :
+        print(f"   + writing plot to '{args.output}'")
+        tsm_plot.save(cities, sol, args.output, args.decimate)
+    else :
+        tsm_plot.plot(cities,sol)
     return 
 
 
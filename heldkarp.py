@@ -0,0 +1,214 @@
+# ***************************************************************************
+# $Id $
+# **************************************************************************/
+##
+# @file     tsm/heldkarp.py
+# @brief    Exact dynamic programming solution of the traveling salesman
+#           problem (TSM) by the Held-Karp algorithm
+# @author   Markus Quandt  \n<markus.quandt@uni-tuebingen.de>
+#
+# $Date: 2021/06/28 00:43:44 $
+# $Revision: cd9b473d1654 $
+#
+# *************************************************************************/
+
+import argparse
+import os.path
+import sys
+import numpy
+import time
+import greedy
+import tsm_distance
+import tsm_plot
+
+
+# --------------------------------------------------------------------------
+# Global parameters for the algorithm
+# --------------------------------------------------------------------------
+
+g_max_memory = 1024**3        # refuse problems whose DP tables need more bytes
+
+
+# --------------------------------------------------------------------------
+# main computation routines
+# --------------------------------------------------------------------------
+
+# number of bytes of the DP tables for a problem with 'count' cities:
+# 2^(N-1) subsets times N-1 last cities, a float64 length and an int8
+# predecessor per entry
+def memory_estimate(count):
+    n = max(count - 1, 0)
+    return (1 << n) * n * (8 + 1)
+
+
+# Held-Karp: the tour starts at city #0, the remaining cities 1,...,N-1
+# are represented by the bits 0,...,N-2 of a subset mask. The DP tables
+#   cost[mask, j]   : length of the shortest path from #0 through all cities
+#                     in mask, ending at city j+1 (j must be in mask)
+#   parent[mask, j] : the city before j+1 on this path (-1 for none)
+# are filled subset size by subset size, vectorized over all subsets of the
+# same size. The optimal tour is then reconstructed from 'parent'.
+# If 'bound' (e.g. the greedy tour length) is given, branch-and-bound is
+# used: a path whose length plus the way back to #0 exceeds the bound cannot
+# be part of an optimal tour (triangle inequality), so it is dropped and the
+# subsets without any remaining path are skipped at the next size.
+# The result is a tour [0,....] starting at 0 but *not* including the final
+# 0, and the tour length including the last piece back to 0.
+def compute(distance, bound=None):
+    count, cols = numpy.shape(distance)
+    if cols != count :
+        raise ValueError
+    if count < 3 :
+        sol = list(range(count))
+        return sol, sum(distance[sol[i-1], sol[i]] for i in range(count)) if count > 1 else 0
+    d = numpy.asarray(distance, dtype=numpy.float64)
+    n = count - 1
+    full = 1 << n
+    inner = d[1:, 1:]               # inner[k, j]: from city k+1 to city j+1
+    back = d[1:, 0]                 # back[j]    : from city j+1 back to #0
+    if bound is not None :
+        bound = bound * (1 + 1e-12)     # do not drop the optimum due to rounding
+
+    # DP tables, and subsets still containing a path (branch-and-bound)
+    cost = numpy.full((full, n), numpy.inf)
+    parent = numpy.full((full, n), -1, dtype=numpy.int8)
+    alive = numpy.zeros(full, dtype=bool)
+    single = 1 << numpy.arange(n)
+    cost[single, numpy.arange(n)] = d[0, 1:]
+    alive[single] = True
+
+    # group subsets by their size
+    masks = numpy.arange(full)
+    size = numpy.zeros(full, dtype=numpy.int8)
+    for b in range(n) :
+        size += (masks >> b) & 1
+
+    # paths through s cities, from the shortest paths through s-1 cities
+    for s in range(2, n + 1) :
+        group = masks[size == s]
+        for j in range(n) :
+            m = group[(group >> j) & 1 == 1]
+            prev = m ^ (1 << j)
+            live = alive[prev]
+            m = m[live]
+            prev = prev[live]
+            if len(m) == 0 :
+                continue
+            c = cost[prev] + inner[:, j]
+            k = numpy.argmin(c, axis=1)
+            best = c[numpy.arange(len(m)), k]
+            if bound is not None :
+                best[best + back[j] > bound] = numpy.inf
+            cost[m, j] = best
+            parent[m, j] = k
+            alive[m] |= numpy.isfinite(best)
+
+    # close the tour and walk back along the predecessors
+    last = cost[full - 1] + back
+    j = int(numpy.argmin(last))
+    dist = last[j]
+    if not numpy.isfinite(dist) :
+        raise ValueError("heldkarp: bound is shorter than the optimal tour")
+    path = []
+    mask = full - 1
+    while j >= 0 :
+        path.append(j + 1)
+        k = int(parent[mask, j])
+        mask ^= 1 << j
+        j = k
+    return [0] + path[::-1], dist
+
+
+# --------------------------------------------------------------------------
+# the main entry point
+# --------------------------------------------------------------------------
+
+def main():
+    # parse command line arguments
+    print("")
+    parser = argparse.ArgumentParser()
+    parser.add_argument("infile", help="input file with TSM problem as json or .npy")
+    parser.add_argument("--cache", action="store_true", default=None,
+                        help="cache the distance matrix on disk (default: environment variable TSM_CACHE=1)")
+    parser.add_argument("-b", "--bound", action="store_true",
+                        help="branch-and-bound, seeded with the greedy tour length")
+    parser.add_argument("-o", "--output", default=None,
+                        help="write the plot of the tour to this file (png, svg, ...) instead of showing it")
+    parser.add_argument("--decimate", type=int, default=1,
+                        help="only plot every k-th city of the tour (with --output)")
+    args = parser.parse_args()
+    prog = os.path.basename(__file__)
+    infile = args.infile
+    print(f"   + reading input file '{infile}'")
+
+    # read problem from input file
+    cities = []
+    try:
+        cities = tsm_distance.read(infile)
+        count  = len(cities)
+    except (OSError, ValueError):
+        print(f"{prog}: error: input file corrupted or invalid json or .npy data")
+    print(f"   + found TSM problem with N={count} cities")
+
+    # refuse to run problem if the DP tables do not fit into memory
+    # (N = 23 needs about 0.8 GB, every further city doubles this)
+    mem = memory_estimate(count)
+    print(f"   + DP tables need {mem / 1024**2:.1f} MB")
+    if mem > g_max_memory :
+        print(f"   + problem too complex")
+        print(f"{prog}: error: the DP tables exceed the limit of {g_max_memory / 1024**2:.0f} MB")
+        sys.exit()
+
+    # create distance matrix
+    print(f"   + setting up distance matrix")
+    distance = tsm_distance.load(infile, cities, cache=args.cache)
+
+    # do computation, take timings
+    print(f"   + starting calculation, this may take some time ... ")
+    try:
+        start = time.perf_counter()
+        bound = None
+        if args.bound :
+            _, bound = greedy.compute(distance)
+            print(f"   + greedy bound : {bound}")
+        sol, res = compute(distance, bound)
+        stop = time.perf_counter()
+    except:
+        print(f"{prog}: error: internal error in main computation")
+        sys.exit()
+    print(f"   + finished calculation")
+
+    # prepare solution for display:
+    #   - cycle such that city #0 is in slot 0  [automatically ensured by program]
+    #   - add city #0 as last city to complete tour
+    #   - reverse solution if sol[1] > sol[-2]
+    # The last convention ensures that the tour is always run in
+    # the same direction, which simplifies the comparision of
+    # different solutions
+    sol.append(0)
+    if len(sol) > 2 and sol[1] > sol[-2]:
+            sol.reverse()
+
+    # present solution and timings
+    print("\n-----------\n")
+    print(f"   + size     : {count}")
+    print(f"   + solution : {sol}")
+    print(f"   + length   : {res}")
+    print(f"   + CPU time : {stop - start} seconds")
+
+    # plot solution
+    print("")
+    if args.output :
+        print(f"   + writing plot to '{args.output}'")
+        tsm_plot.save(cities, sol, args.output, args.decimate)
+    else :
+        tsm_plot.plot(cities,sol)
+    return
+
+
+# --------------------------------------------------------------------------
+# run main() as a script only, not when importing this file as a module
+# --------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
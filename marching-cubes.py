@@ -1,36 +1,24 @@
 #!/usr/bin/python
 from vec3 import Vec3, vec_from_list
-import cube
+from marching import Marching
 from marchingviewer3d import Viewer3d
+import numpy as np
 import multiprocessing
 
 
-class Marching:
-    # Add funtions to calculate the vertices and faces of the 3D object.
-    # A 3D model consists of multiple polygons.  A polygon consists of vertices 
-    # which are vec3 points and faces which are the indexes of the vertices.
-    # A face of a polygon starts with the amount of points per polygon, for this task it wil always be 3.
-    #
-    # For example a square made of two polygons could be:
-    # vertices = [vec3(0, 0, 0), vec3(1, 0, 0), vec3(1, 1, 0), vec3(0, 1, 0)]
-    # faces = [3, 0, 1, 2, 3, 3, 1, 2]
-    # 4 vertices as corners for the square and the faces start with a three 
-    # followed by three indexes corresponding to the vertice list
-    # https://docs.pyvista.org/version/stable/examples/00-load/create-poly.html
-
-    def __init__(self):
-        self.vertices = []
-        self.faces = []
-
-
 LENGTH = 1
 ISOVAL = 1  # iso-value
 SUBDIV = 32  # resolution
 SHOW_SINGLE = False
+ADAPTIVE = False  # only sample the cells near the surface (octree)
+
+
+# The implicit functions are evaluated for whole grids at once, vec then
+# holds arrays of coordinates; they only use operations that work on arrays
 
 
 def sphere(vec):
-    return abs(vec)
+    return vec.dot(vec) ** 0.5
 
 
 def octahedron(vec):
@@ -38,7 +26,7 @@ def octahedron(vec):
 
 
 def cube_func(vec):
-    return max(max(abs(vec.x), abs(vec.y)), abs(vec.z))
+    return np.maximum(np.maximum(abs(vec.x), abs(vec.y)), abs(vec.z))
 
 
 def torus(vec):
@@ -50,6 +38,34 @@ def torus(vec):
     return c * c - d
 
 
+# Bounds of the functions for the adaptive extraction (see marching.py):
+# Lipschitz constants, and for the torus interval arithmetic on boxes
+sphere.lipschitz = 1
+octahedron.lipschitz = 3 ** 0.5
+cube_func.lipschitz = 1
+
+
+# interval of x * x for x in [lo, hi]
+def square_bounds(lo, hi):
+    low = np.where((lo <= 0) & (hi >= 0), 0, np.minimum(lo * lo, hi * hi))
+    return low, np.maximum(lo * lo, hi * hi)
+
+
+def torus_bounds(lo, hi):
+    xl, xh = square_bounds(lo.x, hi.x)
+    yl, yh = square_bounds(lo.y, hi.y)
+    zl, zh = square_bounds(lo.z, hi.z)
+    # c > 0 everywhere
+    cl = xl + yl + zl + .7 * .7 - .2 * .2
+    ch = xh + yh + zh + .7 * .7 - .2 * .2
+    dl = 4 * .7 * .7 * (xl + yl)
+    dh = 4 * .7 * .7 * (xh + yh)
+    return cl * cl - dh, ch * ch - dl
+
+
+torus.bounds = torus_bounds
+
+
 # calculate vertices and faces of marching
 def march_cubes(data):
     marching = data[0]
@@ -58,6 +74,7 @@ def march_cubes(data):
     isoval = data[3]
     function = data[4]
 
+    marching.march(function, length, subdiv, isoval, adaptive=ADAPTIVE)
     return data
 
 
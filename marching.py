@@ -0,0 +1,388 @@
+#!/usr/bin/python
+from vec3 import Vec3
+import numpy as np
+import multiprocessing
+import cube
+
+# The tables of cube.py as integer arrays
+g_corners = np.array(cube.CubeVertices, dtype=np.int64)             # corner offsets (8, 3)
+g_edges = np.array(cube.CubeEdges, dtype=np.int64)                  # corners of each edge (12, 2)
+g_triangles = np.array(cube.CubeTriangles, dtype=np.int64)          # edges of the triangles (256, 16)
+g_triangle_count = np.count_nonzero(g_triangles >= 0, axis=1) // 3  # triangles per cube index (256,)
+
+g_chunk = 64  # cells per chunk and axis of extract_chunked
+g_leaf = 4    # cells per leaf and axis of the octree of extract_adaptive
+
+
+class Marching:
+    # Add funtions to calculate the vertices and faces of the 3D object.
+    # A 3D model consists of multiple polygons.  A polygon consists of vertices
+    # which are vec3 points and faces which are the indexes of the vertices.
+    # A face of a polygon starts with the amount of points per polygon, for this task it wil always be 3.
+    #
+    # For example a square made of two polygons could be:
+    # vertices = [vec3(0, 0, 0), vec3(1, 0, 0), vec3(1, 1, 0), vec3(0, 1, 0)]
+    # faces = [3, 0, 1, 2, 3, 3, 1, 2]
+    # 4 vertices as corners for the square and the faces start with a three
+    # followed by three indexes corresponding to the vertice list
+    # https://docs.pyvista.org/version/stable/examples/00-load/create-poly.html
+    #
+    # The mesh is stored as arrays: points of shape (n, 3) and triangles of
+    # shape (m, 3); the lists vertices and faces in the format above are
+    # only built when they are accessed.
+
+    def __init__(self):
+        self.points = np.zeros((0, 3))
+        self.triangles = np.zeros((0, 3), dtype=np.int32)
+
+    @property
+    def vertices(self):
+        return [Vec3(*p) for p in self.points.tolist()]
+
+    @vertices.setter
+    def vertices(self, vertices):
+        self.points = np.array([(v.x, v.y, v.z) for v in vertices], dtype=float).reshape(-1, 3)
+
+    @property
+    def faces(self):
+        return self.pyvista_faces().tolist()
+
+    @faces.setter
+    def faces(self, faces):
+        self.triangles = np.asarray(faces, dtype=np.int32).reshape(-1, 4)[:, 1:]
+
+    # The faces in the flat format of pyvista, as array
+    def pyvista_faces(self):
+        faces = np.empty((len(self.triangles), 4), dtype=self.triangles.dtype)
+        faces[:, 0] = 3
+        faces[:, 1:] = self.triangles
+        return faces.ravel()
+
+    # Extracts the surface function(p) = isoval in the cube [-length, length]^3
+    # sampled with subdiv cells per axis, see march
+    # With chunk, the grid is processed in chunks of chunk^3 cells by
+    # processes workers, see march_chunked; with adaptive, only the cells
+    # near the surface are sampled, see march_adaptive
+    def march(self, function, length, subdiv, isoval, chunk=None, processes=None, adaptive=False):
+        if adaptive:
+            self.points, self.triangles = march_adaptive(function, length, subdiv, isoval)
+        elif chunk is None:
+            self.points, self.triangles = march(function, length, subdiv, isoval)
+        else:
+            self.points, self.triangles = march_chunked(function, length, subdiv, isoval, chunk, processes)
+        return self
+
+
+# Returns the coordinates of the grid points along one axis of the cube
+# [-length, length] with subdiv cells, extended by pad cells on both sides
+# such that surfaces touching the cube are closed
+def grid(length, subdiv, pad=1):
+    h = 2 * length / subdiv
+    # computed as origin + i * h, like the points of chunks and leaves
+    return (-length - pad * h) + h * np.arange(subdiv + 2 * pad + 1)
+
+
+# Samples the implicit function on the grid xs x ys x zs with a single call;
+# function gets a Vec3 of coordinate arrays and has to work on arrays with
+# numpy operations (eg abs, np.maximum and ** 0.5 instead of max and
+# math.sqrt). Returns the values as array of shape (len(xs), len(ys), len(zs))
+def sample(function, xs, ys=None, zs=None):
+    ys = xs if ys is None else ys
+    zs = xs if zs is None else zs
+    x = np.asarray(xs, dtype=float)[:, np.newaxis, np.newaxis]
+    y = np.asarray(ys, dtype=float)[np.newaxis, :, np.newaxis]
+    z = np.asarray(zs, dtype=float)[np.newaxis, np.newaxis, :]
+    values = function(Vec3(x, y, z))
+    return np.ascontiguousarray(np.broadcast_to(values, (len(xs), len(ys), len(zs))), dtype=float)
+
+
+# Returns the 8 bit cube index of all cells of the sampled values: bit i is
+# set if corner i (see cube.py) lies inside, ie its value is below isoval
+# (leading axes, eg of a stack of blocks, are kept)
+def cube_indices(values, isoval):
+    inside = np.asarray(values) < isoval
+    nx, ny, nz = inside.shape[-3:]
+    index = np.zeros(inside.shape[:-3] + (nx - 1, ny - 1, nz - 1), dtype=np.uint8)
+    for i, (a, b, c) in enumerate(g_corners):
+        index |= inside[..., a:nx - 1 + a, b:ny - 1 + b, c:nz - 1 + c].astype(np.uint8) << i
+    return index
+
+
+# Returns the triangles of the cells with the given cube indices as the
+# cells (flat indices into the cell array) and the cube edges of the three
+# corners of each triangle, shapes (m,) and (m, 3)
+def triangle_edges(index):
+    index = index.ravel()
+    count = g_triangle_count[index]
+    cells = np.flatnonzero(count)
+    count = count[cells]
+    # k-th triangle of each cell
+    tri_cells = np.repeat(cells, count)
+    first = np.cumsum(count) - count
+    k = np.arange(len(tri_cells)) - np.repeat(first, count)
+    # the corners are taken in reversed order, such that the triangles are
+    # oriented counterclockwise seen from outside (larger values)
+    edges = g_triangles[index[tri_cells][:, np.newaxis], 3 * k[:, np.newaxis] + np.array([2, 1, 0])]
+    return tri_cells, edges
+
+
+# Returns the grid point indices (i, j, k) of the two ends of the cube edges
+# edges of the cells cells (flat cell indices for the cell array of shape
+# cell_shape), each as array of shape edges.shape + (3,)
+def edge_ends(cells, edges, cell_shape):
+    ijk = np.stack(np.unravel_index(cells, cell_shape), axis=-1)
+    ijk = ijk.reshape(ijk.shape[:1] + (1,) * (edges.ndim - 1) + (3,))
+    return ijk + g_corners[g_edges[edges, 0]], ijk + g_corners[g_edges[edges, 1]]
+
+
+# Linear interpolation of the crossings of isoval on the grid edges from
+# the grid points a to b (index arrays (..., 3)); returns the positions in
+# grid coordinates
+def interpolate(values, a, b, isoval):
+    va = values[a[..., 0], a[..., 1], a[..., 2]]
+    vb = values[b[..., 0], b[..., 1], b[..., 2]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (isoval - va) / (vb - va)
+    t = np.where(np.isfinite(t), t, 0.5)[..., np.newaxis]
+    return a + t * (b - a)
+
+
+# Returns the global ids of the grid edges from the grid points a to b
+# (index arrays (..., 3) of neighboring points, in any order) in a grid of
+# points of the given shape: 3 * (flat index of the lower point) + axis.
+# Neighboring cells see their common edges under the same id.
+def edge_ids(a, b, shape):
+    lower = np.minimum(a, b)
+    axis = np.argmax(np.abs(b - a), axis=-1)
+    flat = np.ravel_multi_index(tuple(np.moveaxis(lower, -1, 0)), shape)
+    return 3 * flat + axis
+
+
+# Inverse of edge_ids: the grid points of both ends of the edges ids
+def edge_points(ids, shape):
+    a = np.stack(np.unravel_index(ids // 3, shape), axis=-1)
+    return a, a + np.eye(3, dtype=a.dtype)[ids % 3]
+
+
+# Welds the corners of the triangles (given by cells and edges as returned
+# by triangle_edges) that lie on the same grid edge: returns the sorted ids
+# of the crossed grid edges (one per vertex) and the triangles as int32
+# indices into them. No coordinates are compared or hashed.
+def weld(cells, edges, cell_shape):
+    a, b = edge_ends(cells, edges, cell_shape)
+    point_shape = tuple(n + 1 for n in cell_shape)
+    ids, inverse = np.unique(edge_ids(a, b, point_shape), return_inverse=True)
+    return ids, inverse.reshape(-1, 3).astype(np.int32)
+
+
+# Extracts the surface values = isoval from the values sampled on a regular
+# grid with the given origin (coordinates of values[0, 0, 0]) and spacing
+# Returns points (n, 3) and triangles (m, 3, int32). Each vertex is the
+# crossing of one grid edge, shared by all triangles at that edge, and is
+# interpolated once; with welded=False every triangle gets its own three
+# vertices (triangle soup).
+def extract(values, isoval, origin=(0, 0, 0), spacing=1, welded=True):
+    values = np.asarray(values, dtype=float)
+    index = cube_indices(values, isoval)
+    cells, edges = triangle_edges(index)
+    if welded:
+        ids, triangles = weld(cells, edges, index.shape)
+        a, b = edge_points(ids, values.shape)
+    else:
+        a, b = edge_ends(cells, edges, index.shape)
+        a = a.reshape(-1, 3)
+        b = b.reshape(-1, 3)
+        triangles = np.arange(len(a), dtype=np.int32).reshape(-1, 3)
+    pts = interpolate(values, a, b, isoval)
+    return np.asarray(origin, dtype=float) + pts * spacing, triangles
+
+
+# Samples the implicit function in the cube [-length, length]^3 with subdiv
+# cells per axis (plus one cell of padding) and extracts the surface
+# function(p) = isoval; returns points and triangles
+def march(function, length, subdiv, isoval):
+    xs = grid(length, subdiv)
+    values = sample(function, xs)
+    h = 2 * length / subdiv
+    return extract(values, isoval, (xs[0], xs[0], xs[0]), h)
+
+
+# --------------------------------------------------------------------------
+# chunked extraction
+# --------------------------------------------------------------------------
+
+# Values of the grid points lo..hi (inclusive, per axis) of the scalar
+# field source: the path of a .npy file (read memory mapped, so only the
+# chunk is loaded), an array, or an implicit function evaluated at
+# origin + spacing * (i, j, k)
+def _chunk_values(source, lo, hi, origin, spacing):
+    if isinstance(source, str):
+        source = np.load(source, mmap_mode="r")
+    if callable(source):
+        axes = [origin[d] + spacing * np.arange(lo[d], hi[d] + 1) for d in range(3)]
+        return sample(source, *axes)
+    return np.asarray(source[lo[0]:hi[0] + 1, lo[1]:hi[1] + 1, lo[2]:hi[2] + 1], dtype=float)
+
+
+# Extracts the surface in the cells lo..hi-1 of the grid of points with the
+# given shape; the chunk reads the points lo..hi, ie it overlaps the next
+# chunk by one layer of points. Returns the global ids of the crossed edges
+# (sorted), the triangles as indices into them and the vertices.
+def _extract_chunk(task):
+    source, isoval, shape, lo, hi, origin, spacing = task
+    values = _chunk_values(source, lo, hi, origin, spacing)
+    index = cube_indices(values, isoval)
+    cells, edges = triangle_edges(index)
+    if len(cells) == 0:
+        return None
+    a, b = edge_ends(cells, edges, index.shape)
+    lo = np.asarray(lo)
+    ids, inverse = np.unique(edge_ids(a + lo, b + lo, shape), return_inverse=True)
+    a, b = edge_points(ids, shape)
+    pts = np.asarray(origin, dtype=float) + (interpolate(values, a - lo, b - lo, isoval) + lo) * spacing
+    return ids, inverse.reshape(-1, 3).astype(np.int32), pts
+
+
+# Extracts the surface isoval from a scalar field on a grid of points of the
+# given shape with origin and spacing, in chunks of chunk^3 cells that are
+# processed by a pool of processes workers (processes=1: in this process).
+# source is the path of a .npy file, which is memory mapped such that each
+# worker only reads its chunk, an array (shape is then taken from it), or an
+# implicit function, which each worker samples on its own chunk; with a
+# pool, the function must be defined at module level to be picklable.
+# Vertices on the edges between chunks are found in both chunks under the
+# same global edge id (see edge_ids), so the chunk meshes are stitched by
+# a single np.unique over all ids. Returns points and triangles like extract.
+def extract_chunked(source, isoval, origin=(0, 0, 0), spacing=1, shape=None,
+                    chunk=g_chunk, processes=None):
+    if isinstance(source, str):
+        shape = np.load(source, mmap_mode="r").shape
+    elif not callable(source):
+        shape = np.shape(source)
+    shape = tuple(int(n) for n in shape)
+    origin = tuple(float(o) for o in origin)
+    tasks = []
+    for i in range(0, shape[0] - 1, chunk):
+        for j in range(0, shape[1] - 1, chunk):
+            for k in range(0, shape[2] - 1, chunk):
+                lo = (i, j, k)
+                hi = tuple(min(c + chunk, n - 1) for c, n in zip(lo, shape))
+                tasks.append((source, isoval, shape, lo, hi, origin, spacing))
+    if processes == 1:
+        results = [_extract_chunk(t) for t in tasks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(_extract_chunk, tasks)
+    results = [r for r in results if r is not None]
+    if not results:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int32)
+
+    # stitch: the vertices of all chunks, numbered by their global edge id
+    ids = np.concatenate([r[0] for r in results])
+    unique, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    pts = np.concatenate([r[2] for r in results])[first]
+    offsets = np.cumsum([0] + [len(r[0]) for r in results])
+    triangles = np.concatenate([inverse[off + r[1]] for off, r in zip(offsets, results)])
+    return pts, triangles.astype(np.int32)
+
+
+# march for the cube [-length, length]^3, extracted by extract_chunked
+def march_chunked(function, length, subdiv, isoval, chunk=g_chunk, processes=None):
+    xs = grid(length, subdiv)
+    h = 2 * length / subdiv
+    return extract_chunked(function, isoval, (xs[0], xs[0], xs[0]), h, (len(xs),) * 3, chunk, processes)
+
+
+# --------------------------------------------------------------------------
+# adaptive extraction
+# --------------------------------------------------------------------------
+
+# Returns a mask of the blocks of the grid (lower corners lo (k, 3) in grid
+# point indices, size cells per axis) that may contain points with
+# function(p) = isoval. The implicit function can supply a bound as
+# attribute:
+#   - function.bounds(lo, hi): lower and upper bounds of the function on
+#     the boxes from lo to hi (Vec3 of coordinate arrays), eg by interval
+#     arithmetic
+#   - function.lipschitz: a constant L with |f(p) - f(q)| <= L |p - q|; a
+#     block may contain the surface if |f(center) - isoval| <= L * radius
+# Without a bound no block can be excluded.
+def _may_contain(function, isoval, lo, size, origin, spacing):
+    p0 = np.asarray(origin, dtype=float) + lo * spacing
+    p1 = p0 + size * spacing
+    bounds = getattr(function, "bounds", None)
+    if bounds is not None:
+        fmin, fmax = bounds(Vec3(*p0.T), Vec3(*p1.T))
+        return np.broadcast_to((fmin <= isoval) & (isoval <= fmax), (len(lo),))
+    lipschitz = getattr(function, "lipschitz", None)
+    if lipschitz is not None:
+        center = (p0 + p1) / 2
+        value = np.broadcast_to(function(Vec3(*center.T)), (len(lo),))
+        return np.abs(value - isoval) <= lipschitz * size * spacing * 3 ** 0.5 / 2
+    return np.ones(len(lo), dtype=bool)
+
+
+# Extracts the surface function(p) = isoval on the grid of points of the
+# given shape with origin and spacing, like extract, but only samples the
+# cells near the surface: starting with a single block covering the grid,
+# the blocks of an octree are split into eight as long as they may contain
+# the surface (see _may_contain), down to leaves of leaf^3 cells. Only
+# the points of the remaining leaves are sampled, all with a single call
+# of the function, and the leaf meshes are welded by global edge ids.
+# Returns points and triangles like extract.
+def extract_adaptive(function, isoval, origin, spacing, shape, leaf=g_leaf):
+    cells = np.asarray(shape) - 1
+    size = leaf
+    while size < cells.max():
+        size *= 2
+    lo = np.zeros((1, 3), dtype=np.int64)
+    while True:
+        lo = lo[np.all(lo < cells, axis=1)]
+        lo = lo[_may_contain(function, isoval, lo, size, origin, spacing)]
+        if size == leaf or len(lo) == 0:
+            break
+        size //= 2
+        lo = (lo[:, np.newaxis] + size * g_corners).reshape(-1, 3)
+    if len(lo) == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int32)
+
+    # sample all leaves at once, values of shape (leaves, leaf + 1, leaf + 1, leaf + 1)
+    offsets = np.arange(leaf + 1)
+    x, y, z = [origin[d] + (lo[:, d, np.newaxis] + offsets) * spacing for d in range(3)]
+    values = function(Vec3(x[:, :, np.newaxis, np.newaxis], y[:, np.newaxis, :, np.newaxis],
+                           z[:, np.newaxis, np.newaxis, :]))
+    values = np.broadcast_to(values, (len(lo),) + (leaf + 1,) * 3)
+    index = cube_indices(values, isoval)
+    # cells outside the grid (of leaves at its upper end) are empty
+    ijk = np.arange(leaf)
+    outside = ((lo[:, 0, np.newaxis] + ijk >= cells[0])[:, :, np.newaxis, np.newaxis]
+               | (lo[:, 1, np.newaxis] + ijk >= cells[1])[:, np.newaxis, :, np.newaxis]
+               | (lo[:, 2, np.newaxis] + ijk >= cells[2])[:, np.newaxis, np.newaxis, :])
+    index[outside] = 0
+
+    tri_cells, edges = triangle_edges(index)
+    blk, i, j, k = np.unravel_index(tri_cells, index.shape)
+    local = np.stack((i, j, k), axis=-1)[:, np.newaxis]
+    a = local + g_corners[g_edges[edges, 0]]
+    b = local + g_corners[g_edges[edges, 1]]
+    base = lo[blk][:, np.newaxis]
+    ids, first, inverse = np.unique(edge_ids(a + base, b + base, tuple(shape)),
+                                    return_index=True, return_inverse=True)
+    # interpolate each crossed edge once, in the first leaf it was found in
+    a = a.reshape(-1, 3)[first]
+    b = b.reshape(-1, 3)[first]
+    blk = np.repeat(blk, 3)[first]
+    va = values[blk, a[:, 0], a[:, 1], a[:, 2]]
+    vb = values[blk, b[:, 0], b[:, 1], b[:, 2]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (isoval - va) / (vb - va)
+    t = np.where(np.isfinite(t), t, 0.5)[:, np.newaxis]
+    pts = np.asarray(origin, dtype=float) + (lo[blk] + a + t * (b - a)) * spacing
+    return pts, inverse.reshape(-1, 3).astype(np.int32)
+
+
+# march for the cube [-length, length]^3, extracted by extract_adaptive
+def march_adaptive(function, length, subdiv, isoval, leaf=g_leaf):
+    xs = grid(length, subdiv)
+    h = 2 * length / subdiv
+    return extract_adaptive(function, isoval, (xs[0], xs[0], xs[0]), h, (len(xs),) * 3, leaf)
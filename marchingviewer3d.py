@@ -8,26 +8,55 @@ class Viewer3d:
 
     def __init__(self):
         self.p = pv.Plotter(window_size=[1200, 800])
+        self.meshes = {}  # (id of object, decimation) -> (object, PolyData)
 
     def show(self):
         self.p.add_axes()
         self.p.show()
 
+    # Returns the vertices (n, 3), the faces in the flat format of pyvista
+    # and the vertex colors (n, 3) as arrays; vertices can be an array or a
+    # list of Vec3, faces an array of triangles (m, 3) or in pyvista format
     def get_marching_data(self, vertices, faces):
-        colors = []
-        verts = []
-        for vert in vertices:
-            colors.append((0.5 * sin(vert.x) + 0.5, 0.5 * sin(vert.y) + 0.5, 0.5 * sin(vert.z) + 0.5))
-            verts.append((vert.x, vert.y, vert.z))
-
+        if len(vertices) and not isinstance(vertices, np.ndarray):
+            vertices = [(v.x, v.y, v.z) for v in vertices]
+        verts = np.asarray(vertices, dtype=float).reshape(-1, 3)
+        faces = np.asarray(faces, dtype=np.int64)
+        if faces.ndim == 2:
+            faces = np.hstack((np.full((len(faces), 1), 3, dtype=np.int64), faces)).ravel()
+        colors = 0.5 * np.sin(verts) + 0.5
         return verts, faces, colors
 
-    def display_marching_cube(self, mc, offset):
-        vertices, faces, colors = self.get_marching_data(mc.vertices, mc.faces)
-        mesh = pv.PolyData(np.array([[v[0] + offset.x, v[1] + offset.y, v[2] + offset.z] for v in vertices]),
-                           np.array(faces))
-        mesh.point_data["colors"] = np.array(colors)
-        self.p.add_mesh(mesh, show_edges=True, line_width=1, scalars="colors", preference='cell', rgb=True)
+    # Returns the (cached) PolyData of the marching cubes mesh; for previews
+    # optionally decimated, where decimate is the target reduction, ie the
+    # fraction of the triangles to remove (0.9 keeps about a tenth)
+    def get_mesh(self, mc, decimate=None):
+        key = (id(mc), decimate)
+        if key not in self.meshes:
+            if decimate:
+                # the colors depend on the position only, so they are
+                # computed anew for the moved points
+                mesh = self.get_mesh(mc).decimate(decimate)
+                mesh.point_data["colors"] = 0.5 * np.sin(mesh.points) + 0.5
+            else:
+                vertices, faces, colors = self.get_marching_data(mc.points, mc.triangles)
+                mesh = pv.PolyData(vertices, faces)
+                mesh.point_data["colors"] = colors
+            # the object is kept, such that its id is not reused
+            self.meshes[key] = (mc, mesh)
+        return self.meshes[key][1]
+
+    # Forgets the cached meshes of mc (of all objects if None)
+    def invalidate(self, mc=None):
+        if mc is None:
+            self.meshes = {}
+        else:
+            self.meshes = {k: v for k, v in self.meshes.items() if k[0] != id(mc)}
+
+    def display_marching_cube(self, mc, offset, decimate=None):
+        mesh = self.get_mesh(mc, decimate).copy()
+        mesh.points += np.array([offset.x, offset.y, offset.z])
+        self.p.add_mesh(mesh, show_edges=not decimate, line_width=1, scalars="colors", preference='cell', rgb=True)
 
     # only works after implementing normals in task 5
     # shows normal of bezier patch
@@ -0,0 +1,174 @@
+#!/usr/bin/python
+import io
+import sys
+import gzip
+import numpy as np
+
+# Number of rows formatted and written at once
+g_block_rows = 65536
+
+
+# Opens path for writing through a large buffer; a path ending in .gz (or
+# compress=True) is written gzip-compressed. Text mode unless binary.
+def open_mesh_file(path, binary=False, compress=None):
+    if compress is None:
+        compress = str(path).endswith(".gz")
+    if compress:
+        f = gzip.open(path, "wb", compresslevel=1)
+    else:
+        f = open(path, "wb", buffering=1 << 20)
+    if binary:
+        return f
+    return io.TextIOWrapper(f, encoding="ascii", newline="\n", write_through=False)
+
+
+# Writes the rows of the 2d array rows with the format fmt of a single row
+# (eg "v %r %r %r\n"). Like np.savetxt, but the format of a whole block of
+# rows is applied by a single % operation instead of one per row.
+# Floats should be formatted by %r (shortest exact representation of
+# Python floats), ints by %d.
+def write_rows(f, fmt, rows):
+    rows = np.asarray(rows)
+    if rows.ndim == 1:
+        rows = rows[:, np.newaxis]
+    for i in range(0, len(rows), g_block_rows):
+        block = rows[i:i + g_block_rows]
+        f.write((fmt * len(block)) % tuple(block.ravel().tolist()))
+
+
+# Integer colors 0..255 from colors given as floats in [0, 1] or as ints
+def _colors_255(colors):
+    colors = np.asarray(colors)
+    if colors.dtype.kind == "f":
+        colors = np.round(255 * colors)
+    return np.clip(colors, 0, 255).astype(np.int64)
+
+
+# Faces as int array of shape (n_faces, k); all faces need k vertices
+def _faces(faces):
+    faces = np.asarray(faces, dtype=np.int64)
+    if faces.size == 0:
+        return faces.reshape(0, 3)
+    return faces
+
+
+# Writes an OFF file: vertices (n, 3), faces (m, k) of vertex indices,
+# optionally vertex colors (n, 3) and face colors (m, 3), both either as
+# floats in [0, 1] or ints in 0..255. f is a path, an open text file or
+# None for sys.stdout. Vertex colors are written as ints under a COFF
+# header, or with float_colors as floats under the plain OFF header.
+def write_off(f, vertices, faces, vertex_colors=None, face_colors=None, float_colors=False):
+    if f is None:
+        f = sys.stdout
+    if not hasattr(f, "write"):
+        with open_mesh_file(f) as fo:
+            return write_off(fo, vertices, faces, vertex_colors, face_colors, float_colors)
+    vertices = np.asarray(vertices, dtype=float)
+    faces = _faces(faces)
+    f.write("COFF\n" if vertex_colors is not None and not float_colors else "OFF\n")
+    f.write("%d %d 0\n" % (len(vertices), len(faces)))
+    if vertex_colors is None:
+        write_rows(f, "%r %r %r\n", vertices)
+    elif float_colors:
+        vc = np.asarray(vertex_colors, dtype=float)
+        write_rows(f, "%r %r %r %r %r %r\n", np.hstack((vertices, vc)))
+    else:
+        vc = _colors_255(vertex_colors).astype(float)
+        write_rows(f, "%r %r %r %d %d %d\n", np.hstack((vertices, vc)))
+    k = faces.shape[1]
+    rows = np.hstack((np.full((len(faces), 1), k, dtype=np.int64), faces))
+    fmt = "%d" + " %d" * k
+    if face_colors is not None:
+        rows = np.hstack((rows, _colors_255(face_colors)))
+        fmt += " %d %d %d"
+    write_rows(f, fmt + "\n", rows)
+
+
+# Writes a Wavefront OBJ file (1-based vertex indices)
+def write_obj(f, vertices, faces):
+    if f is None:
+        f = sys.stdout
+    if not hasattr(f, "write"):
+        with open_mesh_file(f) as fo:
+            return write_obj(fo, vertices, faces)
+    faces = _faces(faces)
+    write_rows(f, "v %r %r %r\n", np.asarray(vertices, dtype=float))
+    write_rows(f, "f" + " %d" * faces.shape[1] + "\n", faces + 1)
+
+
+# Writes a PLY file, binary little endian by default, which is the fastest
+# format to write and to read for large meshes
+def write_ply(f, vertices, faces, vertex_colors=None, face_colors=None, binary=True):
+    if f is None:
+        f = sys.stdout.buffer
+    if not hasattr(f, "write"):
+        with open_mesh_file(f, binary=True) as fo:
+            return write_ply(fo, vertices, faces, vertex_colors, face_colors, binary)
+    vertices = np.asarray(vertices, dtype=float)
+    faces = _faces(faces)
+    k = faces.shape[1]
+    header = ["ply",
+              "format binary_little_endian 1.0" if binary else "format ascii 1.0",
+              "element vertex %d" % len(vertices),
+              "property float x", "property float y", "property float z"]
+    vtype = [("x", "<f4"), ("y", "<f4"), ("z", "<f4")]
+    if vertex_colors is not None:
+        header += ["property uchar red", "property uchar green", "property uchar blue"]
+        vtype += [("red", "u1"), ("green", "u1"), ("blue", "u1")]
+    header += ["element face %d" % len(faces), "property list uchar int vertex_indices"]
+    ftype = [("k", "u1"), ("indices", "<i4", (k,))]
+    if face_colors is not None:
+        header += ["property uchar red", "property uchar green", "property uchar blue"]
+        ftype += [("red", "u1"), ("green", "u1"), ("blue", "u1")]
+    header.append("end_header\n")
+
+    vdata = np.empty(len(vertices), dtype=vtype)
+    vdata["x"], vdata["y"], vdata["z"] = vertices.T
+    if vertex_colors is not None:
+        vdata["red"], vdata["green"], vdata["blue"] = _colors_255(vertex_colors).T
+    fdata = np.empty(len(faces), dtype=ftype)
+    fdata["k"] = k
+    fdata["indices"] = faces
+    if face_colors is not None:
+        fdata["red"], fdata["green"], fdata["blue"] = _colors_255(face_colors).T
+
+    f.write("\n".join(header).encode("ascii"))
+    if binary:
+        f.write(vdata.tobytes())
+        f.write(fdata.tobytes())
+    else:
+        text = io.TextIOWrapper(f, encoding="ascii", newline="\n")
+        rows = vertices
+        if vertex_colors is not None:
+            rows = np.hstack((vertices, _colors_255(vertex_colors)))
+        write_rows(text, " ".join(["%r"] * 3 + ["%d"] * (rows.shape[1] - 3)) + "\n", rows)
+        rows = np.hstack((np.full((len(faces), 1), k, dtype=np.int64), faces))
+        if face_colors is not None:
+            rows = np.hstack((rows, _colors_255(face_colors)))
+        write_rows(text, " ".join(["%d"] * rows.shape[1]) + "\n", rows)
+        text.flush()
+        text.detach()
+
+
+# Writes the mesh in the format given by the extension of path
+# (.off, .obj, .ply, each optionally followed by .gz)
+def write_mesh(path, vertices, faces, vertex_colors=None, face_colors=None):
+    name = str(path)
+    if name.endswith(".gz"):
+        name = name[:-3]
+    ext = name[name.rfind("."):].lower()
+    if ext == ".off":
+        write_off(path, vertices, faces, vertex_colors, face_colors)
+    elif ext == ".obj":
+        write_obj(path, vertices, faces)
+    elif ext == ".ply":
+        write_ply(path, vertices, faces, vertex_colors, face_colors)
+    else:
+        raise ValueError("unknown mesh format: " + str(path))
+
+
+if __name__ == "__main__":
+    # writes a tetrahedron to standard output
+    v = [(0, 0, 0), (0, 1, 0), (1, 1, 0), (0, 0, 0.5)]
+    t = [(0, 2, 1), (0, 1, 3), (0, 3, 2), (1, 2, 3)]
+    write_off(None, v, t)
@@ -1,6 +1,7 @@
 #!/usr/bin/python
 from vec3 import Vec3
-import math
+import meshwriter
+import numpy as np
 
 
 class TriangleList:
@@ -32,39 +33,35 @@ class TriangleList:
             self.coords[v3] = i3
         self.indices.append((i1, i2, i3))
 
-    def write_obj(self):
-        verts = sorted(self.coords.items(), key=lambda x: x[1])
-        for v in verts:
-            print(v)
-            print("v {0} {1} {2}\n".format(v.x, v.y, v.z))
-        for f in self.indices:
-            print("f {0} {1} {2}\n".format(f[0], f[1], f[2]))
-
-    def write_off(self):
-        print("OFF")
-        num_verts = len(self.coords)
-        num_faces = len(self.indices)
-        num_edges = 0  # irrelevant
-        print("{0} {1} {2}".format(num_verts, num_faces, num_edges))
-        verts = sorted(self.coords.items(), key=lambda x: x[1])
-        for v in verts:
-            v, x = v
-            print_vec3(v)
-        for i in self.indices:
-            print_triangle_indices(i)
-
-    def write_off_color(self):
-        print("OFF")
-        num_verts = len(self.coords)
-        num_faces = len(self.indices)
-        num_edges = 0  # irrelevant
-        print("{0} {1} {2}".format(num_verts, num_faces, num_edges))
-        verts = sorted(self.coords.items(), key=lambda x: x[1])
-        for v in verts:
-            v, x = v
-            print_vec3_color(v)
-        for i in self.indices:
-            print_triangle_indices(i)
+    # Vertices as array of shape (n, 3), ordered by their index
+    def vertices(self):
+        verts = np.empty((self.max_index, 3))
+        for v, i in self.coords.items():
+            verts[i] = (v.x, v.y, v.z) if hasattr(v, "x") else v
+        return verts
+
+    # Triangles as int array of shape (m, 3)
+    def faces(self):
+        return np.array(self.indices, dtype=np.int32).reshape(-1, 3)
+
+    # Writes the triangles to path in the format given by its extension
+    # (.off, .obj or .ply, optionally .gz compressed; see meshwriter)
+    def save(self, path):
+        meshwriter.write_mesh(path, self.vertices(), self.faces())
+
+    # The write methods write to f (a path or an open text file),
+    # by default to standard output
+    def write_obj(self, f=None):
+        meshwriter.write_obj(f, self.vertices(), self.faces())
+
+    def write_off(self, f=None):
+        meshwriter.write_off(f, self.vertices(), self.faces())
+
+    # OFF with the colors 0.5 sin(x) + 0.5 (per coordinate) as floats
+    # behind the coordinates of each vertex
+    def write_off_color(self, f=None):
+        verts = self.vertices()
+        meshwriter.write_off(f, verts, self.faces(), vertex_colors=0.5 * np.sin(verts) + 0.5, float_colors=True)
 
 
 class DumbTriangleList:
@@ -77,31 +74,19 @@ class DumbTriangleList:
         self.coords.append(v2)
         self.coords.append(v3)
 
-    def write_off(self):
-        print("OFF")
-        num_verts = len(self.coords)
-        num_faces = len(self.coords) / 3
-        num_edges = 0  # irrelevant
-        print("{0} {1} {2}".format(num_verts, num_faces, num_edges))
-        for v in self.coords:
-            print_vec3(v)
-        for i in range(len(self.coords) / 3):
-            print_triangle_indices((3 * i, 3 * i + 2, 3 * i + 1))
-
-
-def print_vec3(vec):
-    print("{0} {1} {2}".format(vec.x, vec.y, vec.z))
-
-
-def print_vec3_color(vec):
-    print(
-        "{0} {1} {2} {3} {4} {5}".format(vec.x, vec.y, vec.z, 0.5 * math.sin(vec.x) + 0.5, 0.5 * math.sin(vec.y) + 0.5,
-                                         0.5 * math.sin(vec.z) + 0.5))
+    def save(self, path):
+        verts = np.array([(v.x, v.y, v.z) for v in self.coords]).reshape(-1, 3)
+        meshwriter.write_mesh(path, verts, self._faces())
 
+    def write_off(self, f=None):
+        verts = np.array([(v.x, v.y, v.z) for v in self.coords]).reshape(-1, 3)
+        meshwriter.write_off(f, verts, self._faces())
 
-def print_triangle_indices(i):
-    a, b, c = i
-    print("3 {0} {1} {2}".format(a, b, c))
+    # every three consecutive vertices form a triangle, with the
+    # orientation flipped
+    def _faces(self):
+        i = 3 * np.arange(len(self.coords) // 3, dtype=np.int32)[:, np.newaxis]
+        return i + np.array([0, 2, 1], dtype=np.int32)
 
 
 if __name__ == "__main__":
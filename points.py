@@ -0,0 +1,167 @@
+#!/usr/bin/python
+import numpy as np
+from cagd.vec import Vec2, Vec3
+
+
+# Converts a single point (Vec2, Vec3 or a sequence of coordinates)
+# to a numpy array of its coordinates
+def vec_to_array(v):
+    if isinstance(v, Vec3):
+        return np.array([v.x, v.y, v.z], dtype=float)
+    if isinstance(v, Vec2):
+        return np.array([v.x, v.y], dtype=float)
+    return np.asarray(v, dtype=float)
+
+
+# Converts the coordinates a (an array of length 2 or 3) to a Vec2 or Vec3
+def array_to_vec(a):
+    if len(a) == 2:
+        return Vec2(float(a[0]), float(a[1]))
+    return Vec3(float(a[0]), float(a[1]), float(a[2]))
+
+
+# Converts control points of any kind (PointArray, (nested) lists of
+# Vec2/Vec3, or arrays) to a numpy array of shape (..., dim)
+def to_array(points):
+    if isinstance(points, PointArray):
+        return points.data
+    if isinstance(points, np.ndarray):
+        return points.astype(float, copy=False)
+    # fast path for a flat list of points of one kind
+    if len(points) > 0 and all(type(p) is Vec2 for p in points):
+        return np.array([(p.x, p.y) for p in points], dtype=float)
+    if len(points) > 0 and all(type(p) is Vec3 for p in points):
+        return np.array([(p.x, p.y, p.z) for p in points], dtype=float)
+    return np.array([to_array(p) if isinstance(p, (list, tuple, PointArray)) else vec_to_array(p)
+                     for p in points], dtype=float)
+
+
+# An array of 2d or 3d points stored in a single numpy array of shape
+# (..., dim), i.e. the coordinates of all points lie next to each other
+# instead of being spread over many Vec2/Vec3 objects.
+# It can be used wherever a (nested) list of Vec2/Vec3 is expected:
+# indexing a single point returns a Vec2/Vec3, indexing a row of a 2d
+# array returns a PointArray sharing the same data, and iteration yields
+# the entries one by one. Arithmetic works on all points at once; scalars
+# and arrays of weights (one per point) can be used as factors.
+class PointArray:
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=float)
+        assert self.data.ndim >= 1 and self.data.shape[-1] in (2, 3)
+
+    # Creates a point array from a (nested) list of Vec2/Vec3
+    @classmethod
+    def from_list(cls, points):
+        return cls(to_array(points))
+
+    # Returns the points as (nested) list of Vec2/Vec3
+    def to_list(self):
+        if self.data.ndim == 1:
+            return array_to_vec(self.data)
+        if self.data.ndim == 2:
+            if self.data.shape[1] == 2:
+                return [Vec2(x, y) for x, y in self.data.tolist()]
+            return [Vec3(x, y, z) for x, y, z in self.data.tolist()]
+        return [PointArray(row).to_list() for row in self.data]
+
+    # Dimension of the points (2 or 3)
+    def dim(self):
+        return self.data.shape[-1]
+
+    # Shape of the array without the coordinate axis
+    def shape(self):
+        return self.data.shape[:-1]
+
+    def __len__(self):
+        return len(self.data) if self.data.ndim > 1 else 1
+
+    def __getitem__(self, i):
+        if isinstance(i, tuple):
+            i = i + (slice(None),)
+        item = self.data[i]
+        if item.ndim == 1:
+            return array_to_vec(item)
+        return PointArray(item)
+
+    def __setitem__(self, i, val):
+        if isinstance(i, tuple):
+            i = i + (slice(None),)
+        self.data[i] = to_array(val) if not isinstance(val, (Vec2, Vec3)) else vec_to_array(val)
+
+    def __iter__(self):
+        for i in range(len(self.data)):
+            yield self[i]
+
+    def __str__(self):
+        return str(self.to_list())
+
+    def __repr__(self):
+        return self.__str__()
+
+    # Appends a point at the end of a 1d point array
+    def append(self, point):
+        assert self.data.ndim == 2
+        self.data = np.vstack((self.data, vec_to_array(point)))
+
+    # the other operand as array, weights get an axis for the coordinates
+    def _operand(self, other, weights):
+        if isinstance(other, (PointArray, Vec2, Vec3)):
+            return to_array(other) if isinstance(other, PointArray) else vec_to_array(other)
+        other = np.asarray(other, dtype=float)
+        if weights and other.ndim > 0:
+            return other[..., np.newaxis]
+        return other
+
+    def __add__(self, other):
+        return PointArray(self.data + self._operand(other, False))
+
+    def __radd__(self, other):
+        return self + other
+
+    def __sub__(self, other):
+        return PointArray(self.data - self._operand(other, False))
+
+    def __rsub__(self, other):
+        return PointArray(self._operand(other, False) - self.data)
+
+    def __mul__(self, other):
+        return PointArray(self.data * self._operand(other, True))
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __truediv__(self, other):
+        return PointArray(self.data / self._operand(other, True))
+
+    def __neg__(self):
+        return PointArray(-self.data)
+
+    def __pos__(self):
+        return self
+
+    def __eq__(self, other):
+        if not isinstance(other, PointArray):
+            return NotImplemented
+        return self.data.shape == other.data.shape and bool(np.all(self.data == other.data))
+
+    def __ne__(self, other):
+        return not self == other
+
+    # Dot products of all points with the point(s) other
+    def dot(self, other):
+        return np.sum(self.data * self._operand(other, False), axis=-1)
+
+    # Lengths of all points
+    def __abs__(self):
+        return np.sqrt(self.dot(self))
+
+    def copy(self):
+        return PointArray(self.data.copy())
+
+    def __copy__(self):
+        return self.copy()
+
+    # Returns (min_vec, max_vec) of all points, like the curve classes
+    def get_axis_aligned_bounding_box(self):
+        flat = self.data.reshape(-1, self.dim())
+        return array_to_vec(flat.min(axis=0)), array_to_vec(flat.max(axis=0))
@@ -1,11 +1,13 @@
 #!/usr/bin/python
 from cagd.vec import Vec2
+from cagd.points import PointArray
 import copy
 
 
 # This class represents a chain of points linked by a line
 # Useful for drawing control polygons or a list of points that are
 # to be interpolated by a spline
+# The points can also be given as PointArray
 class Polyline:
     def __init__(self):
         self.points = []
@@ -18,12 +20,11 @@ class Polyline:
         self.color = color
 
     def draw(self, scene, num_samples):
-        for i in range(len(self.points) - 1):
-            p0 = self.points[i]
-            p1 = self.points[i + 1]
-            scene.draw_line(p0, p1, self.color)
+        scene.draw_polyline(self.points, self.color)
 
     def get_axis_aligned_bounding_box(self):
+        if isinstance(self.points, PointArray):
+            return self.points.get_axis_aligned_bounding_box()
         min_vec = copy.copy(self.points[0])
         max_vec = copy.copy(self.points[0])
         for p in self.points:
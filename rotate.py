@@ -35,6 +35,4 @@ bezier_patches = surface.to_bezier_patches()
 
 bezier_patches.refine(2)
 path = "surfaces.off"
-f = open(path, 'w')
-f.write(bezier_patches.export_standard_off())
-f.close()
+bezier_patches.export_standard_off(path)
@@ -3,7 +3,9 @@ from cagd.vec import Vec2, Vec3
 from cagd.bezier import BezierCurve
 from cagd.spline import Spline, Knots
 from cagd.polyline import Polyline
+from cagd.points import to_array
 from PIL import Image, ImageDraw
+import numpy as np
 
 
 class Scene:
@@ -15,7 +17,15 @@ class Scene:
         self.bounding_box = None
         self.image = None
         self.transform = None
-        self.num_samples = 20
+        self.scale = None
+        self.offset = None
+        self.context = None  # the ImageDraw of the image, shared by all elements
+        # Curves are sampled with num_samples line segments per piece; if
+        # None, the number is chosen per piece such that the polyline
+        # deviates at most tolerance pixels from the curve
+        self.num_samples = None
+        self.tolerance = 0.25
+        self.max_samples = 1000
 
     # Sets the longer side of the image to length pixels
     def set_resolution(self, resolution):
@@ -24,9 +34,13 @@ class Scene:
     def set_background(self, color):
         self.background = color
 
+    # Sets a fixed number of samples per curve piece (None: adaptive)
     def set_num_samples(self, num):
         self.num_samples = num
 
+    def set_tolerance(self, tolerance):
+        self.tolerance = tolerance
+
     def add_element(self, elem):
         self.elements.append(elem)
         bounding_box = elem.get_axis_aligned_bounding_box()
@@ -76,20 +90,54 @@ class Scene:
         # print("scale, offset", scale, offset)
         transform = lambda v: Vec2(scale * v.x, -scale * v.y) + offset
         self.transform = transform
+        self.scale = np.array([scale, -scale])
+        self.offset = np.array([offset.x, offset.y])
 
         # Generate the image
         self.image = Image.new("RGB", (image_width, image_height), self.background)
+        self.context = ImageDraw.Draw(self.image)
         for elem in self.elements:
             elem.draw(self, self.num_samples)
 
     def write_to_file(self, path):
         self.image.save(path)
 
+    # Transforms the points pts (array of shape (..., 2) or more
+    # coordinates, which are ignored) from object space to image space
+    def transform_many(self, pts):
+        return np.asarray(pts)[..., :2] * self.scale + self.offset
+
     def draw_line(self, p1, p2, color):
         q1 = self.transform(p1)
         q2 = self.transform(p2)
-        draw = ImageDraw.Draw(self.image)
-        draw.line((q1.x, q1.y, q2.x, q2.y), fill=color)
+        self.context.line((q1.x, q1.y, q2.x, q2.y), fill=color)
+
+    # Draws the polyline through the points (PointArray, list of Vec2 or
+    # array of shape (n, 2)) by a single call of ImageDraw.line
+    def draw_polyline(self, points, color):
+        q = self.transform_many(to_array(points))
+        if len(q) >= 2:
+            self.context.line(q.ravel().tolist(), fill=color)
+
+    # Returns the number of line segments for each of the polynomial curve
+    # pieces of the given degree with the control points ctrl (array of
+    # shape (pieces, degree + 1, dim)), or num_samples if it is fixed.
+    # The distance of a polynomial piece to the polyline through k + 1
+    # equidistant samples is at most n (n - 1) / (8 k^2) * D, where D is
+    # the largest second difference of the control points in image space
+    # (exact for the Bezier points, and a close estimate for the de Boor
+    # points of a spline), so k is chosen such that it stays below the
+    # tolerance.
+    def sample_counts(self, ctrl, degree, num_samples=None):
+        ctrl = np.asarray(ctrl, dtype=float)
+        if num_samples is not None:
+            return np.full(len(ctrl), num_samples, dtype=int)
+        if degree <= 1:
+            return np.ones(len(ctrl), dtype=int)
+        q = ctrl[..., :2] * self.scale
+        d = np.linalg.norm(q[:, :-2] - 2 * q[:, 1:-1] + q[:, 2:], axis=-1).max(axis=1)
+        k = np.ceil(np.sqrt(degree * (degree - 1) / 8 * d / self.tolerance))
+        return np.clip(k, 1, self.max_samples).astype(int)
 
     def show(self):
         self.image.show()
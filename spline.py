@@ -1,11 +1,47 @@
 #! /usr/bin/python
 
+import bisect
 import math
+import numpy as np
 from cagd.vec import Vec2, Vec3
 from cagd.polyline import Polyline
+from cagd.points import PointArray, to_array
 from cagd.bezier import BezierSurface, BezierPatches
-import cagd.utils as utils
+import cagd.tridiagonal as tridiagonal
 import copy
+import functools
+
+
+# The B-splines of degree n over the knots kts at the parameters ts, as
+# index of the first control point (len(ts),) and weights (len(ts), n + 1)
+# of the n + 1 control points starting there: the point at ts[i] is the
+# sum of weights[i, k] * P[start[i] + k]. t = b (the end of the support) is
+# evaluated as the limit from the last non-empty span. Knots and
+# parameters are passed as bytes of float arrays, so the weights for the
+# same knots and parameters are only computed once; only the nonzero
+# weights are kept, such that the cache stays small for large grids.
+@functools.lru_cache(maxsize=32)
+def _basis_weights(kts_bytes, n, ts_bytes):
+    kts = np.frombuffer(kts_bytes, dtype=float)
+    ts = np.frombuffer(ts_bytes, dtype=float)
+    count = len(kts) - n - 1
+    a, b = kts[n], kts[count]
+    assert (np.all((a <= ts) & (ts <= b)))
+    r = np.searchsorted(kts, ts, side="right") - 1
+    r[ts == b] = np.searchsorted(kts, b, side="left") - 1
+    start = r - n
+    weights = Spline._basis(kts, n, ts, r)
+    start.flags.writeable = False
+    weights.flags.writeable = False
+    return start, weights
+
+
+# Dense matrix of shape (len(start), count) of the basis weights (see
+# _basis_weights); it is built on demand only and not cached.
+def _basis_dense(start, weights, count):
+    M = np.zeros((len(start), count))
+    M[np.arange(len(start))[:, np.newaxis], start[:, np.newaxis] + np.arange(weights.shape[1])] = weights
+    return M
 
 
 class Spline:
@@ -59,7 +95,61 @@ class Spline:
     # Stops when the column is only "stop" elements long
     # Returns that column as a list
     def de_boor(self, t, stop):
-        assert False, "Function not implemented"
+        n = self.degree
+        a, b = self.support()
+        assert (a <= t <= b)
+        # t = b is evaluated as the limit from the last non-empty span
+        r = min(self.knots.knot_index(t), len(self.knots) - n - 2)
+        while self.knots[r] == b:
+            r -= 1
+        column = [self.control_points[i] for i in range(r - n, r + 1)]
+        j = 0
+        while len(column) > stop:
+            j += 1
+            new_column = [None for i in range(len(column) - 1)]
+            for i in range(len(new_column)):
+                k = r - n + j + i
+                alpha = (t - self.knots[k]) / (self.knots[k + n + 1 - j] - self.knots[k])
+                new_column[i] = (1 - alpha) * column[i] + alpha * column[i + 1]
+            column = new_column
+        return column
+
+    # Evaluates the spline at all parameters in ts at once
+    # Returns the points as PointArray
+    def evaluate_many(self, ts):
+        return PointArray(self._de_boor_many(ts, 1)[:, 0])
+
+    # Calculates the de Boor scheme for all parameters in ts at once
+    # The knot spans are located by a single binary search, and each column
+    # of the scheme is computed for all parameters together
+    # Returns an array of shape (len(ts), stop, dim)
+    def _de_boor_many(self, ts, stop):
+        n = self.degree
+        ts = np.asarray(ts, dtype=float).ravel()
+        kts = self.knots.as_array()
+        a, b = self.support()
+        assert (np.all((a <= ts) & (ts <= b)))
+        # t = b is evaluated as the limit from the last non-empty span
+        r = np.searchsorted(kts, ts, side="right") - 1
+        r[ts == b] = np.searchsorted(kts, b, side="left") - 1
+        pts = to_array(self.control_points)
+        column = pts[r[:, np.newaxis] + np.arange(-n, 1)]
+        j = 0
+        while column.shape[1] > stop:
+            j += 1
+            k = r[:, np.newaxis] + np.arange(-n + j, 1)
+            alpha = (ts[:, np.newaxis] - kts[k]) / (kts[k + n + 1 - j] - kts[k])
+            alpha = alpha[:, :, np.newaxis]
+            column = (1 - alpha) * column[:, :-1] + alpha * column[:, 1:]
+        return column
+
+    # Returns the matrix of the B-splines of the spline at the parameters
+    # ts, such that the points at ts are basis_matrix(ts) @ control points
+    # The nonzero entries are cached by knots and parameters
+    def basis_matrix(self, ts):
+        ts = np.ascontiguousarray(ts, dtype=float).ravel()
+        start, weights = _basis_weights(self.knots.as_array().tobytes(), self.degree, ts.tobytes())
+        return _basis_dense(start, weights, len(self.knots) - self.degree - 1)
 
     # Adjusts the control points such that it represents the same function,
     # but with an added knot
@@ -67,6 +157,8 @@ class Spline:
         pass
 
     def get_axis_aligned_bounding_box(self):
+        if isinstance(self.control_points, PointArray):
+            return self.control_points.get_axis_aligned_bounding_box()
         min_vec = copy.copy(self.control_points[0])
         max_vec = copy.copy(self.control_points[0])
         for p in self.control_points:
@@ -81,20 +173,30 @@ class Spline:
                 max_vec.y = p.y
         return min_vec, max_vec
 
+    # Draws the spline as single polyline through the samples of all
+    # non-empty knot spans, which are evaluated at once; the number of
+    # samples per span is num_samples, or chosen by the scene from the
+    # flatness of the de Boor points of the span
     def draw(self, scene, num_samples):
-        i = self.degree - 1
-        while i < len(self.knots) - self.degree - 2:
+        n = self.degree
+        spans = []
+        i = n - 1
+        while i < len(self.knots) - n - 2:
             i += 1
             k0 = self.knots[i]
             k1 = self.knots[i + 1]
             if k0 == k1:
                 continue
-            p0 = self(k0)
-            for j in range(1, num_samples + 1):
-                t = k0 + j / num_samples * (k1 - k0)
-                p1 = self(t)
-                scene.draw_line(p0, p1, self.color)
-                p0 = p1
+            spans.append((i, k0, k1))
+        if not spans:
+            return
+        pts = to_array(self.control_points)
+        r = np.array([span[0] for span in spans])
+        counts = scene.sample_counts(pts[r[:, np.newaxis] + np.arange(-n, 1)], n, num_samples)
+        # each span without its end point, which starts the next span
+        ts = [k0 + np.arange(k) / k * (k1 - k0) for (i, k0, k1), k in zip(spans, counts)]
+        ts.append([spans[-1][2]])
+        scene.draw_polyline(self.evaluate_many(np.concatenate(ts)), self.color)
 
     def get_polyline_from_control_points(self):
         pl = Polyline()
@@ -105,16 +207,127 @@ class Spline:
     # Generates a spline that interpolates the given points using the given mode
     # kts is only used as given knots in the mode: INTERPOLATION_GIVEN_KNOTS
     # Returns that spline object
+    # The interpolating spline has natural end conditions (vanishing second
+    # derivative); the first and last control point are the first and last
+    # point, the remaining ones solve a tridiagonal system.
+    # The points can be given as list of Vec2/Vec3 or as PointArray; the
+    # control points are returned in the same form.
     @classmethod
     def interpolate_cubic(cls, mode, points, kts=None):
-        pass
+        p = to_array(points)
+        m = len(p) - 1
+        assert (m >= 2)
+        t = cls._parameters(mode, p, kts)
+        n = 3
+
+        spl = Spline(n)
+        spl.knots = Knots(m + 7)
+        t = t.tolist()
+        spl.knots.knots = [t[0]] * 3 + t + [t[m]] * 3
+        kv = spl.knots.as_array()
+
+        # unknowns d_0, ..., d_m+2; row i+1 holds the condition at t_i,
+        # rows 0 and m+2 fix the end points
+        diag1 = np.zeros(m + 3)
+        diag2 = np.ones(m + 3)
+        diag3 = np.zeros(m + 3)
+        res = np.zeros((m + 3, p.shape[1]))
+        res[0] = p[0]
+        res[m + 2] = p[m]
+        # s(t_i) = p_i: the three B-splines N_i, N_i+1, N_i+2 are nonzero at t_i
+        i = np.arange(1, m)
+        nb = cls._basis(kv, n, kv[4:m + 3], i + 3)
+        diag1[2:m + 1] = nb[:, 0]
+        diag2[2:m + 1] = nb[:, 1]
+        diag3[2:m + 1] = nb[:, 2]
+        res[2:m + 1] = p[1:m]
+        # s''(t_0) = 0: (d_2 - d_1) / (t_2 - t_0) = (d_1 - d_0) / (t_1 - t_0)
+        h1 = t[1] - t[0]
+        h2 = t[2] - t[0]
+        diag1[1] = h2
+        diag2[1] = -(h1 + h2)
+        diag3[1] = h1
+        # s''(t_m) = 0
+        h1 = t[m] - t[m - 1]
+        h2 = t[m] - t[m - 2]
+        diag1[m + 1] = h1
+        diag2[m + 1] = -(h1 + h2)
+        diag3[m + 1] = h2
+
+        ctrl = tridiagonal.solve_tridiagonal_equation(diag1, diag2, diag3, res)
+        spl.control_points = PointArray(ctrl) if isinstance(points, PointArray) else PointArray(ctrl).to_list()
+        return spl
+
+    # Parameter values t_0, ..., t_m of the points p (array) for the mode
+    @classmethod
+    def _parameters(cls, mode, p, kts):
+        m = len(p) - 1
+        dist = np.sqrt(np.sum((p[1:] - p[:-1]) ** 2, axis=1))
+        if mode == cls.INTERPOLATION_GIVEN_KNOTS:
+            t = np.array(list(kts), dtype=float)
+            assert (len(t) == m + 1)
+            return t
+        if mode == cls.INTERPOLATION_EQUIDISTANT:
+            h = np.ones(m)
+        elif mode == cls.INTERPOLATION_CHORDAL:
+            h = dist
+        elif mode == cls.INTERPOLATION_CENTRIPETAL:
+            h = np.sqrt(dist)
+        elif mode == cls.INTERPOLATION_FOLEY:
+            # chordal lengths corrected by the angles at both ends of a segment
+            e = p[1:] - p[:-1]
+            cos = np.sum(-e[:-1] * e[1:], axis=1) / (dist[:-1] * dist[1:])
+            theta = np.minimum(np.pi - np.arccos(np.clip(cos, -1, 1)), np.pi / 2)
+            theta = np.concatenate(([0], theta, [0]))      # angle at p_0, ..., p_m
+            d = np.concatenate(([0], dist, [0]))           # d[i]: length of segment i
+            h = dist * (1 + 1.5 * theta[:-1] * d[:-2] / (d[:-2] + d[1:-1])
+                        + 1.5 * theta[1:] * d[2:] / (d[1:-1] + d[2:]))
+        else:
+            assert False, "Unknown interpolation mode"
+        return np.concatenate(([0], np.cumsum(h)))
+
+    # Values of the n+1 B-splines N_r-n, ..., N_r of degree n at the
+    # parameters ts in the knot spans r (arrays), computed for all
+    # parameters at once; returns an array of shape (len(ts), n + 1)
+    @staticmethod
+    def _basis(kts, n, ts, r):
+        ts = np.asarray(ts, dtype=float)
+        N = np.zeros((len(ts), n + 1))
+        N[:, 0] = 1
+        left = np.zeros((len(ts), n + 1))
+        right = np.zeros((len(ts), n + 1))
+        for j in range(1, n + 1):
+            left[:, j] = ts - kts[r + 1 - j]
+            right[:, j] = kts[r + j] - ts
+            saved = 0
+            for k in range(j):
+                temp = N[:, k] / (right[:, k + 1] + left[:, j - k])
+                N[:, k] = saved + right[:, k + 1] * temp
+                saved = left[:, j - k] * temp
+            N[:, j] = saved
+        return N
 
     # Generates a spline that interpolates the given points and fulfills the definition
     # of a periodic spline with equidistant knots
     # Returns that spline object
+    # With equidistant knots, s(t_i) = (d_i-1 + 4 d_i + d_i+1) / 6, a cyclic
+    # tridiagonal system; the first three control points are repeated at
+    # the end to close the curve.
     @classmethod
     def interpolate_cubic_periodic(cls, points):
-        pass
+        p = to_array(points)
+        m = len(p)
+        assert (m >= 3)
+        d = tridiagonal.solve_almost_tridiagonal_equation(
+            np.full(m, 1 / 6), np.full(m, 4 / 6), np.full(m, 1 / 6), p)
+        ctrl = np.concatenate((d, d[:3]))
+
+        spl = Spline(3)
+        spl.periodic = True
+        spl.knots = Knots(m + 7)
+        spl.knots.knots = list(range(m + 7))
+        spl.control_points = PointArray(ctrl) if isinstance(points, PointArray) else PointArray(ctrl).to_list()
+        return spl
 
     # For splines of degree 3, generate a parallel spline with distance dist
     # The returned spline is off from the exact parallel by at most eps
@@ -213,6 +426,21 @@ class SplineSurface:
 
         return new_pts
 
+    # Evaluates the surface at all points (u, v) of the grid us x vs
+    # Returns a PointArray of shape (len(us), len(vs))
+    # With the basis matrices Bu and Bv of both directions, the grid is
+    # Bu P Bv^T for the control net P, ie two matrix products. Only the
+    # nonzero entries of Bu and Bv are cached (by knots and parameters, see
+    # _basis_weights); the matrices themselves are rebuilt for each call.
+    def evaluate_grid(self, us, vs):
+        ku, kv = self.knots
+        du, dv = self.degree
+        pts = to_array(self.control_points)
+        bu = _basis_weights(ku.as_array().tobytes(), du, np.ascontiguousarray(us, dtype=float).ravel().tobytes())
+        bv = _basis_weights(kv.as_array().tobytes(), dv, np.ascontiguousarray(vs, dtype=float).ravel().tobytes())
+        rows = np.tensordot(_basis_dense(*bu, pts.shape[0]), pts, axes=(1, 0))
+        return PointArray(_basis_dense(*bv, pts.shape[1]) @ rows)
+
     def insert_knot(self, direction, t):
         if direction == self.DIR_U:
             self._insert_knot_u(t)
@@ -227,15 +455,20 @@ class SplineSurface:
         ku, kv = self.knots
         nu = len(self.control_points)
         nv = len(self.control_points[0])
+        # the rows grow by one point, collect them before storing
+        new_control_points = [None] * nu
         for i in range(nu):
             row = self.control_points[i]
             spl = Spline(dv)
             spl.control_points = copy.copy(row)
-            spl.knots = copy.deepcopy(kv)
+            spl.knots = kv.copy()
             spl.periodic = pv
             spl.insert_knot(t)
-            self.control_points[i] = spl.control_points
+            new_control_points[i] = spl.control_points
             self.knots = (ku, spl.knots)
+        if isinstance(self.control_points, PointArray):
+            new_control_points = PointArray.from_list(new_control_points)
+        self.control_points = new_control_points
 
     def _insert_knot_u(self, t):
         du, dv = self.degree
@@ -248,12 +481,14 @@ class SplineSurface:
             col = [self.control_points[j][i] for j in range(nu)]
             spl = Spline(du)
             spl.control_points = col
-            spl.knots = copy.deepcopy(ku)
+            spl.knots = ku.copy()
             spl.periodic = pu
             spl.insert_knot(t)
             for j in range(nu + 1):
                 new_control_points[j][i] = spl.control_points[j]
             self.knots = (spl.knots, kv)
+        if isinstance(self.control_points, PointArray):
+            new_control_points = PointArray.from_list(new_control_points)
         self.control_points = new_control_points
 
     # Build bezier patches based on the spline with multiple knots
@@ -263,11 +498,44 @@ class SplineSurface:
         return patches
 
 
+# Knot vector of a spline
+# The knots are kept in a sorted list, or in a sorted numpy array (see
+# from_array); insert() takes O(n) time in both cases. All lookups use
+# binary search. The knots as float array and the view of the distinct
+# knots with their multiplicities are cached; the caches are reset whenever
+# the knots are changed through this class, i.e. by the knots setter, item
+# assignment and deletion on the Knots object, or insert(). Modifying the
+# list returned by the knots property in place bypasses the caches, the
+# array is returned read-only.
 class Knots:
     # Creates a knots array with n elements
     def __init__(self, n):
         self.knots = [None] * n
 
+    # Creates a knots array from a sorted sequence of knots,
+    # stored as numpy array
+    @classmethod
+    def from_array(cls, values):
+        kts = cls(0)
+        kts.knots = np.array(values, dtype=float)
+        return kts
+
+    @property
+    def knots(self):
+        return self._knots
+
+    @knots.setter
+    def knots(self, values):
+        if isinstance(values, np.ndarray):
+            values = values.view()
+            values.flags.writeable = False
+        self._knots = values
+        self._changed()
+
+    def _changed(self):
+        self._array = None
+        self._unique = None
+
     def validate(self):
         prev = None
         for k in self.knots:
@@ -286,20 +554,93 @@ class Knots:
         return self.knots[i]
 
     def __setitem__(self, i, v):
-        self.knots[i] = v
+        if isinstance(self.knots, np.ndarray):
+            kts = self.knots.copy()
+            kts[i] = v
+            self.knots = kts
+        else:
+            self.knots[i] = v
+            self._changed()
 
     def __delitem__(self, i):
-        del self.knots[i]
+        if isinstance(self.knots, np.ndarray):
+            self.knots = np.delete(self.knots, i)
+        else:
+            del self.knots[i]
+            self._changed()
 
     def __iter__(self):
         return iter(self.knots)
 
+    def copy(self):
+        kts = Knots(0)
+        kts.knots = copy.copy(self.knots)
+        return kts
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return self.copy()
+
+    # Returns the knots as (cached) numpy array
+    def as_array(self):
+        if self._array is None:
+            self._array = np.asarray(self.knots, dtype=float)
+        return self._array
+
+    # Returns the (cached) distinct knots and their multiplicities
+    def unique(self):
+        if self._unique is None:
+            self._unique = np.unique(self.as_array(), return_counts=True)
+        return self._unique
+
+    # Returns the multiplicity of t in the knots (0 if t is no knot)
+    def multiplicity(self, t):
+        values, counts = self.unique()
+        i = np.searchsorted(values, t)
+        if i < len(values) and values[i] == t:
+            return int(counts[i])
+        return 0
+
+    # Inserts t in front of the knots equal to t
     def insert(self, t):
-        i = 0
-        while self[i] < t:
-            i += 1
-        self.knots.insert(i, t)
-
+        i = self._bisect(t, "left")
+        if isinstance(self.knots, np.ndarray):
+            self.knots = np.insert(self.knots, i, t)
+        else:
+            self.knots.insert(i, t)
+            self._changed()
+
+    # Number of knots < t (side "left") or <= t (side "right")
+    def _bisect(self, t, side):
+        if isinstance(self.knots, np.ndarray):
+            return int(np.searchsorted(self.knots, t, side=side))
+        if side == "left":
+            return bisect.bisect_left(self.knots, t)
+        return bisect.bisect_right(self.knots, t)
+
+    # Returns the index i of the knot span [k_i, k_i+1) containing v
+    # For v equal to the last knot, the last non-empty span is returned
+    # Returns None if v is outside of the knots
     def knot_index(self, v):
-        assert False, "Function not implemented"
-        return None
+        n = len(self.knots)
+        if n == 0 or v < self.knots[0] or v > self.knots[-1]:
+            return None
+        if v == self.knots[-1]:
+            i = self._bisect(v, "left") - 1
+            return i if i >= 0 else None
+        return self._bisect(v, "right") - 1
+
+    # knot_index() for all values in vs at once
+    # Returns an integer array, with -1 for the values outside of the knots
+    def knot_indices(self, vs):
+        kts = self.as_array()
+        vs = np.asarray(vs, dtype=float)
+        if len(kts) == 0:
+            return np.full(vs.shape, -1)
+        idx = np.searchsorted(kts, vs, side="right") - 1
+        last = vs == kts[-1]
+        idx[last] = np.searchsorted(kts, kts[-1], side="left") - 1
+        idx[(vs < kts[0]) | (vs > kts[-1])] = -1
+        return idx
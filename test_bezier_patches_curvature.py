@@ -0,0 +1,29 @@
+import numpy as np
+from cagd.bezier import BezierPatches
+
+
+# z = (x^2 + y^2) / 2 over [-1, 1]^2 as biquadratic patch
+def patches_config1():
+    b = [1, -1, 1]
+    pts = [[[-1 + i, -1 + j, (b[i] + b[j]) / 2] for j in range(3)] for i in range(3)]
+    return BezierPatches.from_array(np.array([pts], dtype=float))
+
+
+def test_paraboloid_corners():
+    patches = patches_config1()
+    k = patches.curvatures()
+    # at (x, y) = (+-1, +-1): K = 1 / 9, H = 2 / 3^(3/2), k1 = 1 / sqrt(3), k2 = 1 / 3^(3/2)
+    expected = [1 / 9, 2 / 3 ** 1.5, 1 / 3 ** 0.5, 1 / 3 ** 1.5]
+    for corner in range(4):
+        assert np.allclose(k[0, corner], expected)
+
+
+def test_visualize_curvature_classification():
+    patches = patches_config1()
+    patches.refine(1)
+    patches.visualize_curvature(patches.CURVATURE_GAUSSIAN, patches.COLOR_MAP_CLASSIFICATION)
+    assert np.all(patches.colors_as_array() == (1, 0, 0)), "The paraboloid is elliptic everywhere."
+
+    patch = patches[0]
+    assert patch.color[0] == (1.0, 0.0, 0.0)
+    assert patch.curvature[0] > 0
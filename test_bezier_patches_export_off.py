@@ -0,0 +1,68 @@
+import numpy as np
+from cagd.bezier import BezierSurface, BezierPatches
+from cagd.vec import Vec3
+
+
+# the exports as they were written originally, patch by patch
+def reference_export_off(patches):
+    s = "CBEZ333\n"
+    for patch in patches:
+        for row in patch.control_points:
+            for p in row:
+                s += str(p.x) + " " + str(p.y) + " " + str(p.z) + "\n"
+        for i in (0, 2, 1, 3):
+            s += " ".join(str(x) for x in patch.color[i]) + " 1\n"
+        s += "\n"
+    return s
+
+
+def reference_export_standard_off(patches):
+    d1, d2 = patches[0].degree
+    n = len(patches)
+    s = "OFF\n\n"
+    s += "%d %d %d\n" % ((d1 + 1) * (d2 + 1) * n, d1 * d2 * n, (d1 * (d2 + 1) + d2 * (d1 + 1)) * n)
+    for patch in patches:
+        for row in patch.control_points:
+            for v in row:
+                s += str(v.x) + " " + str(v.y) + " " + str(v.z) + "\n"
+    start_v = 0
+    for patch in patches:
+        color = tuple(round(255 * sum(c[k] for c in patch.color) / 4) for k in range(3))
+        for row in range(d1):
+            for col in range(d2):
+                first_v = start_v + row * (d2 + 1) + col
+                s += "4  %d %d %d %d " % (first_v, first_v + 1, first_v + d2 + 2, first_v + d2 + 1)
+                s += " %d %d %d\n" % color
+        start_v += (d1 + 1) * (d2 + 1)
+    return s
+
+
+def patches_config1():
+    patches = BezierPatches()
+    for k in range(3):
+        surface = BezierSurface((3, 3))
+        for i in range(4):
+            for j in range(4):
+                surface.set_control_point(i, j, Vec3(i + 3 * k, j, np.sin(i * j + k)))
+        patches.append(surface)
+    patches[1].set_colors((1, 0, 0), (0.25, 0.5, 0.75), (0, 1, 0), (0.1, 0.2, 0.3))
+    return patches
+
+
+def test_export_same_as_reference():
+    patches = patches_config1()
+    assert patches.export_off() == reference_export_off(patches)
+    assert patches.export_standard_off() == reference_export_standard_off(patches)
+
+
+def test_export_refined_same_as_reference():
+    patches = patches_config1()
+    patches.refine(1)
+    assert patches.is_array()
+    # same control points, and the default colors of the subdivided patches
+    expected = BezierPatches.from_array(patches.as_array())
+    for p in expected:
+        white = (1, 1, 1)
+        p.set_colors(white, white, white, white)
+    assert patches.export_off() == reference_export_off(expected)
+    assert patches.export_standard_off() == reference_export_standard_off(expected)
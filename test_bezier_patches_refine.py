@@ -0,0 +1,55 @@
+import numpy as np
+from cagd.bezier import BezierSurface, BezierPatches
+from cagd.vec import Vec3
+
+
+def surface_config1():
+    surface = BezierSurface((3, 3))
+    for i in range(4):
+        for j in range(4):
+            surface.set_control_point(i, j, Vec3(i, j, (i - 1.5) * (j - 2) + 0.1 * i * i))
+    return surface
+
+
+def surface_config2():
+    surface = BezierSurface((3, 3))
+    for i in range(4):
+        for j in range(4):
+            surface.set_control_point(i, j, Vec3(i + 0.3 * j, 2 * j, np.sin(i + j)))
+    return surface
+
+
+def test_subdivide_same_surface():
+    surface = surface_config1()
+    b00, b01, b10, b11 = surface.subdivide(0.5, 0.25)
+    for i in range(5):
+        for j in range(5):
+            u, v = i / 4, j / 4
+            assert abs(b00.evaluate(u, v) - surface.evaluate(0.5 * u, 0.25 * v)) < 1e-12
+            assert abs(b01.evaluate(u, v) - surface.evaluate(0.5 * u, 0.25 + 0.75 * v)) < 1e-12
+            assert abs(b10.evaluate(u, v) - surface.evaluate(0.5 + 0.5 * u, 0.25 * v)) < 1e-12
+            assert abs(b11.evaluate(u, v) - surface.evaluate(0.5 + 0.5 * u, 0.25 + 0.75 * v)) < 1e-12
+
+
+def test_refine_matches_subdivide():
+    patches = BezierPatches()
+    patches.append(surface_config1())
+    patches.append(surface_config2())
+    ref = []
+    for p in patches:
+        for q in p.subdivide(0.5, 0.5):
+            ref.extend(q.subdivide(0.5, 0.5))
+
+    patches.refine(2)
+    assert patches.is_array(), "Refined patches should be kept as array."
+    assert len(patches) == 32
+    pts = patches.as_array()
+    assert pts.shape == (32, 4, 4, 3)
+    for p, q in zip(ref, pts):
+        assert np.allclose(np.array([[[v.x, v.y, v.z] for v in row] for row in p.control_points]), q)
+
+    # accessing single patches turns the array into BezierSurface objects
+    patch = patches[5]
+    assert not patches.is_array()
+    assert patch.degree == (3, 3)
+    assert abs(patch.evaluate(0.3, 0.6) - ref[5].evaluate(0.3, 0.6)) < 1e-12
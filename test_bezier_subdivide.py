@@ -0,0 +1,45 @@
+from cagd.bezier import BezierCurve
+from cagd.vec import Vec2
+from cagd.points import PointArray
+
+
+def curve_config1():
+    curve = BezierCurve(3)
+    curve.control_points = [Vec2(0, 0), Vec2(0.5, 4), Vec2(4, 4.5), Vec2(5, 1)]
+    return curve
+
+
+def curve_config2():
+    curve = BezierCurve(5)
+    curve.control_points = PointArray([[0, 0], [1, 3], [2, -1], [4, 4], [5, 0], [7, 2]])
+    return curve
+
+
+def test_evaluate_many():
+    for curve in (curve_config1(), curve_config2()):
+        for num in (5, 100):
+            ts = [i / num for i in range(num + 1)]
+            pts = curve.evaluate_many(ts)
+            assert type(pts) == PointArray
+            assert len(pts) == num + 1
+            for t, p in zip(ts, pts):
+                assert abs(p - curve(t)) < 1e-12, "Batched and scalar evaluation differ."
+
+
+def test_subdivide_end_points():
+    curve = curve_config1()
+    left, right = curve.subdivide(0.3)
+    assert left.degree == right.degree == 3
+    assert left.control_points[0] == curve.control_points[0]
+    assert right.control_points[3] == curve.control_points[3]
+    assert abs(left.control_points[3] - curve(0.3)) < 1e-12
+    assert left.control_points[3] == right.control_points[0]
+
+
+def test_subdivide_same_curve():
+    for curve in (curve_config1(), curve_config2()):
+        left, right = curve.subdivide(0.4)
+        for i in range(11):
+            s = i / 10
+            assert abs(left(s) - curve(0.4 * s)) < 1e-12
+            assert abs(right(s) - curve(0.4 + 0.6 * s)) < 1e-12
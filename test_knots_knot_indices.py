@@ -0,0 +1,68 @@
+from cagd.spline import Knots
+
+
+def config1():
+    kts = Knots(6)
+    kts.knots = [0, 2, 3, 5, 7, 8]
+    return kts
+
+
+def config2():
+    return Knots.from_array([0, 0, 1, 1, 1, 2, 2])
+
+
+def test_same_as_knot_index():
+    for kts in (config1(), config2(), Knots.from_array(config1().knots)):
+        vs = [-0.1, 0, 0.1, 0.2, 1, 1.1, 2, 2.1, 4, 7, 8, 8.1]
+        idx = kts.knot_indices(vs)
+        for v, i in zip(vs, idx):
+            expected = kts.knot_index(v)
+            assert i == (-1 if expected is None else expected), "Batch lookup differs for v={}".format(v)
+
+
+def test_array_mode_knot_index():
+    kts = config2()
+
+    assert kts.knot_index(-0.1) is None
+    assert kts.knot_index(0) == 1
+    assert kts.knot_index(1) == 4
+    assert kts.knot_index(1.1) == 4
+    assert kts.knot_index(2) == 4
+    assert kts.knot_index(2.1) is None
+
+
+def test_insert():
+    for kts in (config1(), Knots.from_array(config1().knots)):
+        kts.insert(4)
+        kts.insert(0)
+        kts.insert(8)
+        kts.insert(2.5)
+        assert list(kts) == [0, 0, 2, 2.5, 3, 4, 5, 7, 8, 8]
+        assert kts.knot_index(4.5) == 5, "Cached lookup data was not updated."
+
+
+def test_multiplicity():
+    kts = config2()
+
+    assert kts.multiplicity(0) == 2
+    assert kts.multiplicity(1) == 3
+    assert kts.multiplicity(0.5) == 0
+    kts.insert(1)
+    assert kts.multiplicity(1) == 4, "Cached multiplicities were not updated."
+    kts[0] = -1
+    assert kts.multiplicity(0) == 1, "Cached multiplicities were not updated."
+
+
+def test_array_mode_read_only():
+    kts = config2()
+
+    try:
+        kts.knots[0] = -1
+    except ValueError:
+        pass
+    else:
+        assert False, "Knots array can be changed in place, bypassing the caches."
+    kts[0] = -1
+    del kts[1]
+    assert list(kts) == [-1, 1, 1, 1, 2, 2]
+    assert kts.knot_index(0) == 0, "Cached lookup data was not updated."
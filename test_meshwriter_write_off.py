@@ -0,0 +1,62 @@
+import gzip
+import numpy as np
+from cagd import meshwriter
+
+
+def mesh_config1():
+    vertices = [(0, 0, 0), (0, 1, 0), (1, 1, 0), (0, 0, 0.5)]
+    faces = [(0, 2, 1), (0, 1, 3), (0, 3, 2), (1, 2, 3)]
+    return vertices, faces
+
+
+def read_off(lines):
+    assert lines[0] == "OFF"
+    nv, nf, ne = map(int, lines[1].split())
+    vertices = np.array([list(map(float, l.split())) for l in lines[2:2 + nv]])
+    faces = np.array([list(map(int, l.split()))[1:] for l in lines[2 + nv:2 + nv + nf]])
+    return vertices, faces
+
+
+def test_write_off(tmp_path):
+    vertices, faces = mesh_config1()
+    path = tmp_path / "mesh.off"
+    meshwriter.write_mesh(path, vertices, faces)
+    v, f = read_off(path.read_text().splitlines())
+    assert np.array_equal(v, np.array(vertices, dtype=float))
+    assert np.array_equal(f, np.array(faces))
+
+
+def test_write_gzip_and_blocks(tmp_path):
+    meshwriter.g_block_rows = 3
+    try:
+        vertices, faces = mesh_config1()
+        path = tmp_path / "mesh.off.gz"
+        meshwriter.write_mesh(path, vertices, faces)
+        v, f = read_off(gzip.open(path, "rt").read().splitlines())
+        assert np.array_equal(v, np.array(vertices, dtype=float))
+        assert np.array_equal(f, np.array(faces))
+    finally:
+        meshwriter.g_block_rows = 65536
+
+
+def test_write_obj_and_ply(tmp_path):
+    vertices, faces = mesh_config1()
+    meshwriter.write_mesh(tmp_path / "mesh.obj", vertices, faces)
+    lines = (tmp_path / "mesh.obj").read_text().splitlines()
+    assert lines[4] == "f 1 3 2", "OBJ indices start at 1."
+
+    meshwriter.write_mesh(tmp_path / "mesh.ply", vertices, faces)
+    data = (tmp_path / "mesh.ply").read_bytes()
+    header, body = data.split(b"end_header\n")
+    assert b"element vertex 4" in header and b"element face 4" in header
+    assert len(body) == 4 * 3 * 4 + 4 * (1 + 3 * 4)
+
+
+def test_write_off_float_colors_to_stdout(capsys):
+    vertices, faces = mesh_config1()
+    colors = np.full((4, 3), 0.25)
+    meshwriter.write_off(None, vertices, faces, vertex_colors=colors, float_colors=True)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "OFF", "Float colors are written under the plain OFF header."
+    assert lines[3] == "0.0 1.0 0.0 0.25 0.25 0.25"
+    assert lines[6] == "3 0 2 1"
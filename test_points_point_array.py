@@ -0,0 +1,64 @@
+from cagd.points import PointArray
+from cagd.vec import Vec2, Vec3
+from cagd.bezier import BezierCurve
+
+
+def points_config1():
+    return [Vec2(0, 0), Vec2(0.5, 4), Vec2(4, 4.5), Vec2(5, 1)]
+
+
+def points_config2():
+    return [[Vec3(i, j, i * j) for j in range(3)] for i in range(4)]
+
+
+def test_round_trip():
+    pts = points_config1()
+    arr = PointArray.from_list(pts)
+    assert len(arr) == 4, "Wrong number of points."
+    assert arr.to_list() == pts, "Points changed in the conversion."
+
+    grid = points_config2()
+    arr = PointArray.from_list(grid)
+    assert arr.shape() == (4, 3), "Wrong shape of the point grid."
+    assert arr.to_list() == grid, "Points changed in the conversion."
+
+
+def test_indexing_returns_vectors():
+    arr = PointArray.from_list(points_config2())
+    assert type(arr[1][2]) == Vec3, "A single point should be a cagd.Vec3."
+    assert arr[1][2] == Vec3(1, 2, 2)
+    assert type(arr[1]) == PointArray, "A row should be a PointArray."
+
+    arr[1][2] = Vec3(7, 8, 9)
+    assert arr[1, 2] == Vec3(7, 8, 9), "Rows should share the data of the array."
+
+
+def test_batched_arithmetic():
+    pts = points_config1()
+    arr = PointArray.from_list(pts)
+    res = 0.25 * arr + arr * 0.75 - arr
+    for p in res:
+        assert abs(p) < 1e-12
+
+    weights = [0, 1, 2, 3]
+    res = arr * weights
+    for w, p, q in zip(weights, pts, res):
+        assert q == w * p
+
+    assert list(arr.dot(Vec2(1, 0))) == [p.x for p in pts]
+
+
+def test_curve_accepts_point_array():
+    pts = points_config1()
+    curve = BezierCurve(3)
+    curve.control_points = pts
+    ref = [curve(i / 10) for i in range(11)]
+
+    curve.control_points = PointArray.from_list(pts)
+    for i in range(11):
+        p = curve(i / 10)
+        assert type(p) == Vec2
+        assert abs(p - ref[i]) < 1e-12
+
+    low, high = curve.get_axis_aligned_bounding_box()
+    assert low == Vec2(0, 0) and high == Vec2(5, 4.5)
@@ -0,0 +1,37 @@
+import numpy as np
+import cagd.scene_2d as scene_2d
+from cagd.bezier import BezierCurve
+from cagd.vec import Vec2
+
+
+def scene_config1():
+    curve = BezierCurve(2)
+    curve.control_points = [Vec2(0, 0), Vec2(5, 10), Vec2(10, 0)]
+    sc = scene_2d.Scene()
+    sc.set_resolution(200)
+    sc.add_element(curve)
+    sc.write_image()
+    return sc, curve
+
+
+def test_sample_counts_within_tolerance():
+    sc, curve = scene_config1()
+    ctrl = np.array([[[p.x, p.y] for p in curve.control_points]])
+    k = int(sc.sample_counts(ctrl, 2)[0])
+    ts = np.linspace(0, 1, 1001)
+    exact = sc.transform_many(curve.evaluate_many(ts).data)
+    samples = sc.transform_many(curve.evaluate_many(np.arange(k + 1) / k).data)
+    # distance of the exact points to the chords of their segments
+    seg = np.minimum((ts * k).astype(int), k - 1)
+    a, b = samples[seg], samples[seg + 1]
+    d = b - a
+    dist = np.abs(d[:, 0] * (exact - a)[:, 1] - d[:, 1] * (exact - a)[:, 0]) / np.linalg.norm(d, axis=1)
+    assert dist.max() <= sc.tolerance + 1e-9
+
+
+def test_fixed_and_linear_sample_counts():
+    sc, curve = scene_config1()
+    ctrl = np.zeros((3, 4, 2))
+    assert list(sc.sample_counts(ctrl, 3, 20)) == [20, 20, 20]
+    assert list(sc.sample_counts(ctrl, 1)) == [1, 1, 1]
+    assert list(sc.sample_counts(ctrl, 3)) == [1, 1, 1], "Straight pieces need a single segment."
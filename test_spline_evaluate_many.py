@@ -0,0 +1,66 @@
+from cagd.spline import Knots, Spline
+from cagd.vec import Vec2
+from cagd.points import PointArray
+
+
+def spline_config1():
+    kts = Knots(9)
+    kts.knots = [0, 1, 2, 3, 4, 5, 6, 7]
+    degree = 3
+    control_points = [Vec2(0, 0), Vec2(0.5, 4), Vec2(4, 4.5), Vec2(5, 1)]
+    spl = Spline(degree)
+    spl.knots = kts
+    spl.control_points = control_points
+    return spl
+
+
+def spline_config2():
+    kts = Knots(11)
+    kts.knots = [0, 0, 2.5, 3, 4.5, 5, 6.2, 7, 7]
+    degree = 3
+    control_points = [Vec2(0, 0), Vec2(0.5, 4), Vec2(4, 4.5), Vec2(5, 1), Vec2(4, 8)]
+    spl = Spline(degree)
+    spl.knots = kts
+    spl.control_points = control_points
+    return spl
+
+
+def samples(spl, num):
+    a, b = spl.support()
+    return [a + i / num * (b - a) for i in range(num + 1)]
+
+
+def test_correct_return_type():
+    spl = spline_config1()
+
+    pts = spl.evaluate_many(samples(spl, 10))
+    assert type(pts) == PointArray, "Batched evaluation should return a cagd.PointArray."
+    assert len(pts) == 11, "Wrong number of points returned."
+
+
+def test_same_as_scalar_evaluation():
+    for spl in (spline_config1(), spline_config2()):
+        ts = samples(spl, 50)
+        pts = spl.evaluate_many(ts)
+        for t, p in zip(ts, pts):
+            assert abs(p - spl(t)) < 1e-5, "Batched and scalar evaluation differ."
+
+
+def test_point_array_control_points():
+    spl = spline_config2()
+    ts = samples(spl, 20)
+    ref = spl.evaluate_many(ts)
+
+    spl.control_points = PointArray.from_list(spl.control_points)
+    assert spl.evaluate_many(ts) == ref
+    assert abs(spl(ts[7]) - ref[7]) < 1e-12
+
+
+def test_t_outside_of_support():
+    spl = spline_config1()
+    try:
+        spl.evaluate_many([3, 3.5, 5])
+    except AssertionError:
+        assert True
+        return
+    assert False, "t=5 is not in the support and de Boor should not be executed."
@@ -43,9 +43,9 @@ def test_interpolate_equidistant_control_points_values():
     assert 2.39 < spl.control_points[1].x < 2.4, "Incorrect x coordinate of control point at position 1."
     assert 2.34 < spl.control_points[1].y < 2.36, "Incorrect y coordinate of control point at position 1."
     assert 6.78 < spl.control_points[2].x < 6.79, "Incorrect x coordinate of control point at position 2."
-    assert 1.04 < spl.control_points[2].y < 1.05, "Incorrect y coordinate of control point at position 2."
+    assert 1.04 < spl.control_points[2].y <= 1.05 + 1e-9, "Incorrect y coordinate of control point at position 2."
     assert 2.65 < spl.control_points[3].x < 2.66, "Incorrect x coordinate of control point at position 3."
-    assert -1.20 < spl.control_points[3].y < -1.19, "Incorrect y coordinate of control point at position 3."
+    assert -1.20 - 1e-9 <= spl.control_points[3].y < -1.19, "Incorrect y coordinate of control point at position 3."
     assert 0.58 < spl.control_points[4].x < 0.59, "Incorrect x coordinate of control point at position 4."
     assert 2.54 < spl.control_points[4].y < 2.56, "Incorrect y coordinate of control point at position 4."
     assert 0.86 < spl.control_points[5].x < 0.87, "Incorrect x coordinate of control point at position 5."
@@ -0,0 +1,46 @@
+import numpy as np
+from cagd.spline import SplineSurface, Knots, _basis_weights
+from cagd.points import PointArray
+from cagd.vec import Vec3
+
+
+def surface_config1():
+    f = lambda x, y: x * x / 5 + x * y / 4 + 10 / (1 + x * x + y * y) + y / 2
+    ctrl_pts = [[Vec3(x, y, f(x, y)) for x in range(-3, 3)] for y in range(-3, 4)]
+    d = 3
+    ku = Knots(len(ctrl_pts) + d + 1)
+    kv = Knots(len(ctrl_pts[0]) + d + 1)
+    for kts in (ku, kv):
+        m = len(kts)
+        for i in range(m):
+            kts[i] = min(max(i - d, 0), m - 2 * d - 1)
+    surface = SplineSurface((d, d))
+    surface.control_points = ctrl_pts
+    surface.knots = (ku, kv)
+    return surface
+
+
+def test_evaluate_grid():
+    surface = surface_config1()
+    (a, b), (c, d) = surface.support()
+    us = np.linspace(a, b, 9)[:-1]
+    vs = np.linspace(c, d, 7)[:-1]
+    grid = surface.evaluate_grid(us, vs)
+    assert type(grid) == PointArray
+    assert grid.shape() == (8, 6)
+    for i, u in enumerate(us):
+        for j, v in enumerate(vs):
+            assert abs(grid[i, j] - surface.evaluate(u, v)) < 1e-12
+
+
+def test_evaluate_grid_corners():
+    surface = surface_config1()
+    (a, b), (c, d) = surface.support()
+    grid = surface.evaluate_grid([a, b], [c, d])
+    pts = surface.control_points
+    assert abs(grid[0, 0] - pts[0][0]) < 1e-12
+    assert abs(grid[1, 1] - pts[-1][-1]) < 1e-12
+    # the second evaluation reuses the cached basis weights of both directions
+    hits = _basis_weights.cache_info().hits
+    assert grid == surface.evaluate_grid([a, b], [c, d])
+    assert _basis_weights.cache_info().hits == hits + 2
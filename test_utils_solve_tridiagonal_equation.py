@@ -1,4 +1,4 @@
-from cagd.utils import solve_tridiagonal_equation
+from cagd.tridiagonal import solve_tridiagonal_equation
 from cagd.vec import Vec2
 
 
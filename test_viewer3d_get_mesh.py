@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+pv = pytest.importorskip("pyvista")
+pv.OFF_SCREEN = True
+
+from cagd.bezier import BezierSurface, BezierPatches
+from cagd.vec import Vec3
+from cagd.viewer3d import Viewer3d
+
+
+def patches_config1():
+    surface = BezierSurface((3, 3))
+    for i in range(4):
+        for j in range(4):
+            surface.set_control_point(i, j, Vec3(i, j, np.sin(i + j)))
+    patches = BezierPatches()
+    patches.append(surface)
+    patches.refine(3)
+    # red to blue along the patches
+    t = np.linspace(0, 1, len(patches))[:, np.newaxis, np.newaxis]
+    colors = (1 - t) * np.array([1.0, 0, 0]) + t * np.array([0, 0, 1.0]) + np.zeros((1, 4, 3))
+    return BezierPatches.from_array(patches.as_array(), colors)
+
+
+def test_get_mesh_cached():
+    viewer = Viewer3d()
+    patches = patches_config1()
+    mesh = viewer.get_mesh(patches)
+    assert mesh.n_points == 64 * 16 and mesh.n_cells == 64 * 9
+    assert viewer.get_mesh(patches) is mesh, "The mesh was not cached."
+    viewer.invalidate(patches)
+    assert viewer.get_mesh(patches) is not mesh
+
+
+def test_get_mesh_decimated_keeps_colors():
+    viewer = Viewer3d()
+    patches = patches_config1()
+    full = viewer.get_mesh(patches)
+    mesh = viewer.get_mesh(patches, 0.75)
+    assert 0 < mesh.n_cells < 2 * full.n_cells
+    assert "colors" in mesh.point_data, "The decimation dropped the colors."
+    colors = mesh.point_data["colors"]
+    assert colors.shape == (mesh.n_points, 3)
+    assert colors[:, 0].max() > 200 and colors[:, 2].max() > 200 and colors[:, 1].max() == 0
+    viewer.display_object(patches, Vec3(0, 0, 0), 0.75)
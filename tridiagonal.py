@@ -0,0 +1,92 @@
+#!/usr/bin/python
+import numpy as np
+from cagd.vec import Vec2, Vec3
+from cagd.points import PointArray, to_array, array_to_vec
+
+
+# Converts the right hand side(s) res to a 2d array with one column per
+# right hand side; returns the array and a function converting the
+# solution back to the type of res:
+#   - list of Vec2/Vec3 -> list of Vec2/Vec3
+#   - PointArray        -> PointArray
+#   - array (n,) or (n, k) -> array of the same shape
+def _columns(res):
+    if isinstance(res, PointArray):
+        return res.data.reshape(len(res.data), -1), lambda x: PointArray(x)
+    if isinstance(res, np.ndarray) or (len(res) > 0 and not isinstance(res[0], (Vec2, Vec3))):
+        res = np.asarray(res, dtype=float)
+        shape = res.shape
+        return res.reshape(shape[0], -1), lambda x: x.reshape(shape)
+    return to_array(res), lambda x: [array_to_vec(p) for p in x]
+
+
+# Thomas algorithm for the tridiagonal matrix with sub-diagonal a (a[0]
+# unused), diagonal b and super-diagonal c (c[-1] unused), applied to all
+# columns of the n x k array d. The elimination factors only depend on the
+# matrix and are computed once for all columns. Returns the n x k solution.
+def _thomas(a, b, c, d):
+    n = len(b)
+    a = [float(v) for v in a]
+    b = [float(v) for v in b]
+    c = [float(v) for v in c]
+    inv = [0.0] * n
+    cp = [0.0] * n
+    inv[0] = 1 / b[0]
+    for i in range(1, n):
+        cp[i - 1] = c[i - 1] * inv[i - 1]
+        inv[i] = 1 / (b[i] - a[i] * cp[i - 1])
+    # the two sweeps run column by column on Python floats, which is much
+    # faster than indexing numpy rows for the few columns of a point list
+    cols = np.asarray(d, dtype=float).reshape(n, -1).T.tolist()
+    x = np.empty((len(cols), n))
+    for j, col in enumerate(cols):
+        y = 0.0
+        ys = []
+        for v, l, f in zip(col, a, inv):
+            y = (v - l * y) * f
+            ys.append(y)
+        y = 0.0
+        for i in range(n - 1, -1, -1):
+            y = ys[i] - cp[i] * y
+            ys[i] = y
+        x[j] = ys
+    return x.T
+
+
+# Solves the tridiagonal system with sub-diagonal diag1, diagonal diag2
+# and super-diagonal diag3 in O(n). res holds one right hand side per row:
+# Vec2/Vec3 (all coordinates are solved at once), PointArray, or an array
+# of shape (n,) or (n, k). Returns the solution in the same form.
+def solve_tridiagonal_equation(diag1, diag2, diag3, res):
+    assert (len(diag1) == len(diag2) == len(diag3) == len(res))
+    d, back = _columns(res)
+    return back(_thomas(diag1, diag2, diag3, d))
+
+
+# Solves the cyclic tridiagonal system, where diag1[0] is the entry in the
+# upper right corner and diag3[-1] the entry in the lower left corner, in
+# O(n) by the Sherman-Morrison formula: the corner entries are removed by
+# a rank one update u v^T, and both T y = res and T z = u are solved in
+# the same pass as additional column. Arguments as above.
+def solve_almost_tridiagonal_equation(diag1, diag2, diag3, res):
+    n = len(diag2)
+    assert (len(diag1) == len(diag3) == len(res) == n and n >= 3)
+    d, back = _columns(res)
+    a = np.array(diag1, dtype=float)
+    b = np.array(diag2, dtype=float)
+    c = np.array(diag3, dtype=float)
+    alpha = a[0]                 # upper right corner
+    beta = c[-1]                 # lower left corner
+    gamma = -b[0]
+    b[0] -= gamma
+    b[-1] -= alpha * beta / gamma
+    u = np.zeros(n)
+    u[0] = gamma
+    u[-1] = beta
+    sol = _thomas(a, b, c, np.column_stack((d, u)))
+    y = sol[:, :-1]
+    z = sol[:, -1]
+    # v = (1, 0, ..., 0, alpha / gamma)
+    vy = y[0] + alpha / gamma * y[-1]
+    vz = z[0] + alpha / gamma * z[-1]
+    return back(y - np.outer(z, vy / (1 + vz)))
@@ -0,0 +1,118 @@
+# ***************************************************************************
+# $Id $
+# **************************************************************************/
+##
+# @file     tsm/tsm_distance.py
+# @brief    distance matrix set-up shared by all TSM solvers
+# @author   Markus Quandt  \n<markus.quandt@uni-tuebingen.de>
+#
+# $Date: 2021/06/28 00:43:44 $
+# $Revision: cd9b473d1654 $
+#
+# *************************************************************************/
+
+import hashlib
+import json
+import os
+import os.path
+import numpy as np
+
+
+# --------------------------------------------------------------------------
+# Global parameters
+# --------------------------------------------------------------------------
+
+g_cache_dir  = os.path.join(os.environ.get("XDG_CACHE_HOME") or
+                            os.path.join(os.path.expanduser("~"), ".cache"), "tsm")
+g_cache_env  = "TSM_CACHE"          # set to 1 to enable the disk cache by default
+g_cache_min  = 2000                 # smaller problems are never cached
+g_block_size = 64 * 1024 * 1024     # scratch memory (bytes) for one block of rows
+
+
+# --------------------------------------------------------------------------
+# reading TSM problems
+# --------------------------------------------------------------------------
+
+# Cities of the TSM problem stored in infile (see generate.py): a read-only
+# memory-mapped count x 2 array for a binary '.npy' file, otherwise the list
+# of [x,y] pairs of a json file.
+def read(infile):
+    if infile.endswith(".npy") :
+        return np.load(infile, mmap_mode="r")
+    with open(infile, "r") as f :
+        return json.load(f)
+
+
+# --------------------------------------------------------------------------
+# distance matrix set-up
+# --------------------------------------------------------------------------
+
+# Euclidean distance matrix of the cities (list of [x,y] or N x 2 array).
+# The rows are computed in blocks, such that the temporary arrays of one
+# block use at most g_block_size bytes; for small N this is a single block,
+# i.e. plain broadcasting of all pairs at once.
+# dtype : numpy.float64 (default) or numpy.float32
+# block : number of rows per block, 0 means automatic choice
+# out   : optional pre-allocated N x N array (e.g. a memmap) to fill
+def matrix(cities, dtype=np.float64, block=0, out=None):
+    xy = np.asarray(cities, dtype=dtype)
+    count = len(xy)
+    x = xy[:, 0]
+    y = xy[:, 1]
+    if out is None :
+        out = np.empty((count, count), dtype=dtype)
+    if block < 1 :
+        # three temporaries of size block x N are alive at the same time
+        block = g_block_size // (3 * max(count, 1) * xy.itemsize)
+        block = max(1, min(count, block))
+    for a in range(0, count, block) :
+        b = min(a + block, count)
+        dx = x[a:b, np.newaxis] - x[np.newaxis, :]
+        dy = y[a:b, np.newaxis] - y[np.newaxis, :]
+        dx *= dx
+        dy *= dy
+        dx += dy
+        np.sqrt(dx, out=out[a:b])
+    return out
+
+
+# hash of the contents of the file infile, used as the cache key
+def file_hash(infile):
+    h = hashlib.sha1()
+    with open(infile, "rb") as f :
+        for chunk in iter(lambda: f.read(1 << 20), b"") :
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# Distance matrix for the TSM problem stored in infile, whose cities have
+# already been read into 'cities'. If caching is enabled, the matrix is
+# cached on disk as .npy file in g_cache_dir, keyed by the hash of infile,
+# and returned as a read-only memory map, such that repeated runs on the
+# same instance skip the set-up. Caching is opt-in: cache=True enables it,
+# cache=None (default) enables it if the environment variable g_cache_env
+# is set to 1. Problems with fewer than g_cache_min cities are never cached,
+# their matrix is cheaper to set up than to hash and read. The cache is not
+# cleaned up automatically; delete g_cache_dir to free the disk space.
+# If the cache cannot be written, the matrix is set up in memory.
+def load(infile, cities, dtype=np.float64, cache=None):
+    if cache is None :
+        cache = os.environ.get(g_cache_env, "") == "1"
+    if not cache or len(cities) < g_cache_min :
+        return matrix(cities, dtype)
+    dtype = np.dtype(dtype)
+    try:
+        key = f"{file_hash(infile)}-{dtype.name}"
+        path = os.path.join(g_cache_dir, key + ".npy")
+        if not os.path.exists(path) :
+            os.makedirs(g_cache_dir, exist_ok=True)
+            count = len(cities)
+            tmp = os.path.join(g_cache_dir, f"{key}.{os.getpid()}.tmp")
+            out = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=(count, count))
+            matrix(cities, dtype, out=out)
+            out.flush()
+            del out
+            os.replace(tmp, path)          # atomic: never leaves a partial cache
+        return np.load(path, mmap_mode="r")
+    except OSError:
+        return matrix(cities, dtype)
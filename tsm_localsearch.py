@@ -0,0 +1,185 @@
+# ***************************************************************************
+# $Id $
+# **************************************************************************/
+##
+# @file     tsm/tsm_localsearch.py
+# @brief    local search post-optimization of any tour: 2-opt, Or-opt and
+#           segment reversal moves
+# @author   Markus Quandt  \n<markus.quandt@uni-tuebingen.de>
+#
+# $Date: 2021/06/28 00:43:44 $
+# $Revision: cd9b473d1654 $
+#
+# *************************************************************************/
+
+import collections
+import numpy as np
+import tsm_neighbors
+
+
+# --------------------------------------------------------------------------
+# Global parameters
+# --------------------------------------------------------------------------
+
+g_neighbors = 8               # candidates per city if none are given
+g_segment   = 3               # maximal length of the segments moved by Or-opt
+g_eps       = 1e-10           # minimal gain of an accepted move
+
+
+# --------------------------------------------------------------------------
+# The tour
+# --------------------------------------------------------------------------
+
+# A closed tour as array of cities together with the position of each city,
+# such that the successor and predecessor of a city are found in O(1).
+# All moves are built from 2-opt moves, which reverse the shorter of the
+# two paths between the exchanged edges; the orientation of the tour may
+# thus change, and the moves are specified by edges, not by positions.
+class ring :
+    def __init__(self, perm):
+        self.perm  = [int(c) for c in perm]
+        self.count = len(self.perm)
+        self.pos   = [0] * self.count
+        for i, c in enumerate(self.perm) :
+            self.pos[c] = i
+
+    def succ(self, c):
+        return self.perm[(self.pos[c] + 1) % self.count]
+
+    def pred(self, c):
+        return self.perm[self.pos[c] - 1]
+
+    # next city in direction 'fwd' (True: successor, False: predecessor)
+    def next(self, c, fwd):
+        return self.succ(c) if fwd else self.pred(c)
+
+    # 2-opt move: remove the edges (a,b) and (c,d) and add (a,c) and (b,d).
+    # b and d must both follow or both precede a and c, respectively.
+    def move2(self, a, b, c, d):
+        if b == self.succ(a) :
+            self.__reverse(self.pos[b], self.pos[c])
+        else :
+            self.__reverse(self.pos[a], self.pos[d])
+
+    # reverse the positions i,...,j (modulo N); reversing the complementary
+    # positions gives the same closed tour, so the shorter part is reversed
+    def __reverse(self, i, j):
+        N = self.count
+        l = (j - i) % N + 1
+        if 2 * l > N :
+            i, j = (j + 1) % N, (i - 1) % N
+            l = N - l
+        p = self.perm
+        pos = self.pos
+        for _ in range(l // 2) :
+            a = p[i]
+            b = p[j]
+            p[i] = b
+            pos[b] = i
+            p[j] = a
+            pos[a] = j
+            i = (i + 1) % N
+            j = (j - 1) % N
+
+
+# --------------------------------------------------------------------------
+# local search
+# --------------------------------------------------------------------------
+
+# Improve the closed tour 'perm' by 2-opt and Or-opt moves until no
+# improving move is left; returns the improved tour (list) and its length.
+#   - 2-opt replaces the edges (a,b), (c,d) by (a,c), (b,d)
+#   - Or-opt moves a segment of 1 to g_segment cities between two other
+#     neighboring cities, either as it is or reversed (the 3-opt "segment
+#     reversal" move)
+# New edges are only searched among the candidate lists 'neighbors' (see
+# tsm_neighbors), and only as long as the new edge is shorter than the
+# removed one (positive gain criterion). Cities are processed from a queue;
+# a city leaves the queue when no improving move starts at it ("don't-look
+# bit") and re-enters when one of its edges is changed. Each pass thus
+# costs about O(N * k).
+def optimize(perm, distance, neighbors=None):
+    N = len(perm)
+    if N < 5 :
+        return list(perm), float(np.asarray(distance)[perm, np.roll(perm, -1)].sum())
+    if neighbors is None :
+        neighbors = tsm_neighbors.from_distance(distance, g_neighbors)
+    cand = np.asarray(neighbors).tolist()
+    d = distance
+    t = ring(perm)
+    queue = collections.deque(t.perm)
+    active = [True] * N
+
+    def push(*cities) :
+        for c in cities :
+            if not active[c] :
+                active[c] = True
+                queue.append(c)
+
+    # 2-opt move from the edge (a, next(a)); returns True if applied
+    def two_opt(a, fwd) :
+        b = t.next(a, fwd)
+        dab = d[a, b]
+        for c in cand[a] :
+            g = dab - d[a, c]
+            if g <= 0 :
+                break
+            e = t.next(c, fwd)
+            if c == b or e == a :
+                continue
+            if g + d[c, e] - d[b, e] > g_eps :
+                t.move2(a, b, c, e)
+                push(a, b, c, e)
+                return True
+        return False
+
+    # Or-opt move of the segment a = s1,...,s2 of length l in direction fwd
+    # between two neighboring cities x, y; returns True if applied
+    def or_opt(a, l, fwd) :
+        s1 = a
+        seg = [s1]
+        for _ in range(l - 1) :
+            seg.append(t.next(seg[-1], fwd))
+        s2 = seg[-1]
+        p = t.next(s1, not fwd)
+        n = t.next(s2, fwd)
+        g0 = d[p, s1] + d[s2, n] - d[p, n]
+        if g0 <= g_eps :
+            return False
+        for s in (s1, s2) if l > 1 else (s1,) :
+            for c in cand[s] :
+                if d[s, c] >= g0 :
+                    break
+                if c in seg :
+                    continue
+                for x, y in ((c, t.next(c, fwd)), (t.next(c, not fwd), c)) :
+                    if x in seg or y in seg :
+                        continue
+                    dxy = d[x, y]
+                    same = d[x, s1] + d[s2, y] - dxy
+                    flip = d[x, s2] + d[s1, y] - dxy
+                    if g0 - min(same, flip) > g_eps :
+                        # p s1..s2 n ... x y -> p n ... x s2..s1 y [-> x s1..s2 y]
+                        t.move2(p, s1, x, y)
+                        if x != n :
+                            t.move2(p, x, n, s2)
+                        if l > 1 and same < flip :
+                            t.move2(x, s2, s1, y)
+                        push(p, n, x, y, s1, s2)
+                        return True
+        return False
+
+    while queue :
+        a = queue.popleft()
+        active[a] = False
+        improved = two_opt(a, True) or two_opt(a, False)
+        if not improved :
+            for l in range(1, g_segment + 1) :
+                if or_opt(a, l, True) or or_opt(a, l, False) :
+                    improved = True
+                    break
+        if improved :
+            push(a)
+
+    perm = t.perm
+    return perm, float(np.asarray(distance)[perm, np.roll(perm, -1)].sum())
@@ -0,0 +1,174 @@
+# ***************************************************************************
+# $Id $
+# **************************************************************************/
+##
+# @file     tsm/tsm_moves.py
+# @brief    tour moves with constant-time evaluation of the length change
+# @author   Markus Quandt  \n<markus.quandt@uni-tuebingen.de>
+#
+# $Date: 2021/06/28 00:43:44 $
+# $Revision: cd9b473d1654 $
+#
+# *************************************************************************/
+
+import random
+import numpy as np
+
+
+# --------------------------------------------------------------------------
+# The tour and its moves
+# --------------------------------------------------------------------------
+
+# A closed tour perm[0] -> perm[1] -> ... -> perm[N-1] -> perm[0] together
+# with the moves used by the annealing: reversing a section and relocating
+# a section. A move is proposed together with the change dE of the tour
+# length, which only depends on the three or four edges that the move
+# replaces, i.e. it costs O(1). Accepted moves are applied in place; this
+# costs at most O(N/2) element swaps and never copies the whole tour.
+# All positions are taken modulo N, i.e. sections may wrap around the end.
+# With candidate lists (see tsm_neighbors), the proposals only create edges
+# from a city to one of its candidates; the position of each city in the 
+# tour is then tracked as well.
+class tour :
+    def __init__(self, perm, distance, neighbors=None):
+        rows, cols = distance.shape
+        if (rows != cols) or (rows != len(perm)) :
+            raise ValueError("tour: invalid distance matrix in constructor")
+        self.perm    = np.array(perm)       # private copy, modified in place
+        self.__dist  = distance
+        self.__count = rows
+        self.__cand  = neighbors
+        self.__pos   = None
+        if neighbors is not None :
+            self.__pos = np.empty(rows, dtype=np.intp)
+            self.__pos[self.perm] = np.arange(rows)
+
+    # length change when reversing the section [a, a+l-1]
+    # Sections of length l < 2 or l > N-2 do not change the closed tour.
+    def reverse_delta(self, a, l):
+        N = self.__count
+        if l < 2 or l > N - 2 :
+            return 0.0
+        p = self.perm
+        d = self.__dist
+        b = (a + l - 1) % N
+        u = p[a - 1]                        # predecessor of the section
+        v = p[(b + 1) % N]                  # successor of the section
+        return d[u, p[b]] + d[p[a], v] - d[u, p[a]] - d[p[b], v]
+
+    # length change when cutting out the section [a, a+l-1] and inserting it
+    # after the j-th city following the section. With m = N-l cities left,
+    # j is in the range 0,...,m-2 (j = m-1 is the original location).
+    def relocate_delta(self, a, l, j):
+        N = self.__count
+        p = self.perm
+        d = self.__dist
+        b = (a + l - 1) % N
+        s0 = p[a]                           # first and last city of section
+        s1 = p[b]
+        prev = p[a - 1]
+        next = p[(b + 1) % N]
+        u = p[(b + 1 + j) % N]              # new neighbors of the section
+        v = p[(b + 2 + j) % N]
+        return d[prev, next] + d[u, s0] + d[s1, v] - d[prev, s0] - d[s1, next] - d[u, v]
+
+    # reverse the section [a, a+l-1] in place
+    # Reversing the complementary section yields the same closed tour, so
+    # the shorter of both is reversed.
+    def reverse(self, a, l):
+        N = self.__count
+        if 2 * l > N :
+            a = (a + l) % N
+            l = N - l
+        self.__reverse(a, l)
+
+    # move the section [a, a+l-1] behind the j-th city following it, in place
+    # Either the section is swapped with the j+1 cities behind it, or the
+    # remaining m-j-1 cities in front of it are swapped with the section;
+    # both give the same closed tour, and the shorter range is rotated.
+    def relocate(self, a, l, j):
+        N = self.__count
+        m = N - l
+        if j + 1 <= m - j - 1 :
+            self.__rotate(a, l + j + 1, l)
+        else :
+            self.__rotate((a + l + j + 1) % N, N - j - 1, m - j - 1)
+
+    # propose a random move: a reversal or a relocation
+    # of a section with random start and length. Returns (dE, move), where
+    # move is None if the tour is unchanged by the move.
+    def propose(self):
+        if self.__cand is not None :
+            return self.propose_candidate()
+        N = self.__count
+        a = random.randint(0, N-1)
+        l = random.randint(0, N-1)
+        if random.getrandbits(1) :
+            if l < 2 or l > N - 2 :
+                return 0.0, None
+            return self.reverse_delta(a, l), (0, a, l)
+        if l < 1 or l > N - 2 :
+            return 0.0, None
+        j = random.randint(0, N - l - 2)
+        return self.relocate_delta(a, l, j), (1, a, l, j)
+
+    # propose a random move that joins a city to one of its candidates: 
+    # either a reversal that makes candidate y follow a random city x, or a
+    # relocation of a random section behind a candidate of its first city.
+    # Returns (dE, move) like propose(); relocations onto a candidate inside
+    # the section or in front of it are no moves.
+    def propose_candidate(self):
+        N = self.__count
+        p = self.perm
+        if random.getrandbits(1) :
+            i = random.randint(0, N-1)
+            y = random.choice(self.__cand[p[i]])
+            a = (i + 1) % N
+            l = (self.__pos[y] - i) % N
+            if l < 2 or l > N - 2 :
+                return 0.0, None
+            return self.reverse_delta(a, l), (0, a, l)
+        a = random.randint(0, N-1)
+        l = random.randint(1, N-2) if N > 2 else 0
+        if l < 1 :
+            return 0.0, None
+        y = random.choice(self.__cand[p[a]])
+        j = (self.__pos[y] - a - l) % N
+        if j > N - l - 2 :
+            return 0.0, None
+        return self.relocate_delta(a, l, j), (1, a, l, j)
+
+    # apply a move returned by propose()
+    def apply(self, move):
+        if move is None :
+            return
+        if move[0] == 0 :
+            self.reverse(move[1], move[2])
+        else :
+            self.relocate(move[1], move[2], move[3])
+
+    # reverse the l entries starting at position a (modulo N)
+    def __reverse(self, a, l):
+        p = self.perm
+        if a + l <= self.__count :
+            p[a:a+l] = p[a:a+l][::-1]
+            if self.__pos is not None :
+                self.__pos[p[a:a+l]] = np.arange(a, a + l)
+        else :
+            idx = np.arange(a, a + l) % self.__count
+            p[idx] = p[idx[::-1]]
+            if self.__pos is not None :
+                self.__pos[p[idx]] = idx
+
+    # rotate the l entries starting at position a (modulo N) left by k
+    def __rotate(self, a, l, k):
+        p = self.perm
+        if a + l <= self.__count :
+            p[a:a+l] = np.concatenate((p[a+k:a+l], p[a:a+k]))
+            if self.__pos is not None :
+                self.__pos[p[a:a+l]] = np.arange(a, a + l)
+        else :
+            idx = np.arange(a, a + l) % self.__count
+            p[idx] = np.concatenate((p[idx[k:]], p[idx[:k]]))
+            if self.__pos is not None :
+                self.__pos[p[idx]] = idx
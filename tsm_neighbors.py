@@ -0,0 +1,90 @@
+# ***************************************************************************
+# $Id $
+# **************************************************************************/
+##
+# @file     tsm/tsm_neighbors.py
+# @brief    candidate lists of the nearest neighbors of each city
+# @author   Markus Quandt  \n<markus.quandt@uni-tuebingen.de>
+#
+# $Date: 2021/06/28 00:43:44 $
+# $Revision: cd9b473d1654 $
+#
+# *************************************************************************/
+
+import numpy as np
+
+
+# --------------------------------------------------------------------------
+# Global parameters
+# --------------------------------------------------------------------------
+
+g_per_cell = 2                # average number of cities per grid cell
+
+
+# --------------------------------------------------------------------------
+# candidate lists
+# --------------------------------------------------------------------------
+
+# The k nearest neighbors of every city, as N x k array of city indices
+# sorted by increasing distance (row i never contains i itself).
+# The cities are hashed into a uniform grid of about N/g_per_cell cells.
+# For each city, the square window of cells around its own cell is grown
+# until it holds k other cities and the k-th distance does not exceed the
+# distance to the window border, i.e. no closer city can be outside.
+def candidates(cities, k):
+    xy = np.asarray(cities, dtype=np.float64)[:, :2]
+    N = len(xy)
+    k = min(k, N - 1)
+    if k < 1 :
+        return np.empty((N, 0), dtype=np.intp)
+
+    # hash cities into g x g cells; cell c holds cities order[start[c]:start[c+1]]
+    lo = xy.min(axis=0)
+    span = max((xy.max(axis=0) - lo).max(), 1e-12)
+    g = max(1, int(np.sqrt(N / g_per_cell)))
+    h = span / g
+    cx = np.minimum(((xy[:, 0] - lo[0]) / h).astype(np.intp), g - 1)
+    cy = np.minimum(((xy[:, 1] - lo[1]) / h).astype(np.intp), g - 1)
+    cell = cx * g + cy
+    order = np.argsort(cell, kind="stable")
+    start = np.searchsorted(cell[order], np.arange(g * g + 1))
+
+    result = np.empty((N, k), dtype=np.intp)
+    for i in range(N) :
+        r = 1
+        while True :
+            x0 = max(cx[i] - r, 0)
+            x1 = min(cx[i] + r, g - 1)
+            y0 = max(cy[i] - r, 0)
+            y1 = min(cy[i] + r, g - 1)
+            # the cells y0..y1 of one column x are contiguous in 'order'
+            near = np.concatenate([order[start[x*g + y0]:start[x*g + y1 + 1]] for x in range(x0, x1 + 1)])
+            near = near[near != i]
+            full = x0 == 0 and y0 == 0 and x1 == g - 1 and y1 == g - 1
+            if len(near) >= k :
+                d = xy[near] - xy[i]
+                d = d[:, 0]*d[:, 0] + d[:, 1]*d[:, 1]
+                sel = np.argpartition(d, k - 1)[:k]
+                if full or d[sel].max() <= (r * h)**2 :
+                    break
+            r += 1
+        result[i] = near[sel[np.argsort(d[sel], kind="stable")]]
+    return result
+
+
+# The k nearest neighbors of every city from the rows of the distance matrix,
+# for problems where the coordinates are not at hand. This costs O(N^2).
+def from_distance(distance, k, block=1024):
+    N = len(distance)
+    k = min(k, N - 1)
+    result = np.empty((N, max(k, 0)), dtype=np.intp)
+    if k < 1 :
+        return result
+    for a in range(0, N, block) :
+        b = min(a + block, N)
+        rows = np.array(distance[a:b], dtype=np.float64)
+        rows[np.arange(b - a), np.arange(a, b)] = np.inf     # exclude the city itself
+        sel = np.argpartition(rows, k - 1, axis=1)[:, :k]
+        d = np.take_along_axis(rows, sel, axis=1)
+        result[a:b] = np.take_along_axis(sel, np.argsort(d, axis=1, kind="stable"), axis=1)
+    return result
@@ -1,9 +1,11 @@
 import operator
+import numpy as np
 import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
 
 def plot(points, path: list):
+    # the interactive backend is only set up when a window is shown
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
     x = []
     y = []
     for point in points:
@@ -20,6 +22,31 @@ def plot(points, path: list):
     ia = path[0]
     # plt.arrow(x[ie], y[ie], x[ia] - x[ie], y[ia] - y[ie], color='r', length_includes_head=True)
     plt.xlim(0, 1)
-    plt.ylim(0, 1) 
-    
+    plt.ylim(0, 1)
+
     plt.show(block=True)
+
+# Render the tour offscreen (Agg backend, no display needed) and write it to
+# outfile; the format (png, svg, pdf, ...) is taken from the file extension.
+# The whole tour is a single LineCollection instead of one arrow per edge.
+# With decimate = k > 1 only every k-th city of the tour is drawn, which
+# keeps the shape of very large tours at a fraction of the cost.
+def save(points, path: list, outfile, decimate=1, dpi=150):
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.collections import LineCollection
+    xy = np.asarray(points, dtype=np.float64)[:, :2]
+    path = np.asarray(path)
+    if decimate > 1 :
+        path = np.append(path[:-1:decimate], path[-1])
+    tour = xy[path]
+    fig = Figure(figsize=(8, 8))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+    ax.add_collection(LineCollection([tour], colors='r', linewidths=0.8))
+    small = len(tour) <= 10000
+    ax.plot(tour[:, 0], tour[:, 1], 'co', markersize=4 if small else 1, rasterized=not small)
+    ax.set_xlim(0, 1)
+    ax.set_ylim(0, 1)
+    ax.set_aspect('equal')
+    fig.savefig(outfile, dpi=dpi)
@@ -1,55 +1,66 @@
 import pyvista as pv
 import numpy as np
+from cagd.bezier import BezierPatches
 
 class Viewer3d:
 
     def __init__(self):
         self.p = pv.Plotter(window_size=[1200, 800])
+        self.meshes = {}  # (id of object, decimation) -> (object, PolyData)
 
     def show(self):
         self.p.add_axes()
         self.p.show()
 
+    # Returns the control polygons of the patches (BezierPatches or list of
+    # BezierSurface) as arrays: vertices (n, 3), faces in the flat format
+    # of pyvista and the face colors (m, 3) with values 0..255
     def get_data(self, patches):
-        def avg_color(f_cs):
-            avg_f_c = [0, 0, 0]
-            for f_c in f_cs:
-                avg_f_c[0] += f_c[0]
-                avg_f_c[1] += f_c[1]
-                avg_f_c[2] += f_c[2]
-            return (round(255*avg_f_c[0]/4),
-                    round(255*avg_f_c[1]/4),
-                    round(255*avg_f_c[2]/4))
-
-        vertices = []
-        faces = []
-        colors = []
-
-        for patch in patches:
-            for v_row in patch.control_points:
-                for vertex in v_row:
-                    vertices.append([vertex.x, vertex.y, vertex.z])
-
-        start_v = 0
-        for patch in patches:
-            cps = patch.control_points
-            row_num = len(cps)
-            col_num = len(cps[0])
-            for row in range(row_num - 1):
-                for col in range(col_num - 1):
-                    first_v = start_v + row*col_num + col
-                    f_vertices = [4, first_v, first_v + 1, first_v + 1 + col_num, first_v + col_num]
-                    faces.extend(f_vertices)
-                    colors.append(avg_color(patch.color))
-            start_v += 16
-
-        return vertices, faces, colors
-
-    def display_object(self, obj, offset):
-        vertices, faces, colors = self.get_data(obj.patches)  
-        mesh = pv.PolyData(np.array([[v[0] + offset.x, v[1] + offset.y, v[2] + offset.z] for v in vertices]) , np.array(faces))
-        mesh.cell_data["colors"] = np.array(colors)
-        self.p.add_mesh(mesh, show_edges=True, line_width=1, scalars="colors", preference='cell', rgb=True)
+        if not isinstance(patches, BezierPatches):
+            bp = BezierPatches()
+            bp.patches = patches
+            patches = bp
+        vertices, quads, colors = patches.quad_mesh()
+        faces = np.hstack((np.full((len(quads), 1), 4, dtype=quads.dtype), quads)).ravel()
+        return vertices, faces, np.round(255 * colors).astype(np.uint8)
+
+    # Returns the (cached) PolyData of the object; for interactive previews
+    # optionally decimated, where decimate is the target reduction, ie the
+    # fraction of the triangles to remove (0.9 keeps about a tenth)
+    def get_mesh(self, obj, decimate=None):
+        key = (id(obj), decimate)
+        if key not in self.meshes:
+            if decimate:
+                # the face colors as active point scalars, which the
+                # decimation only carries along with the attribute error
+                mesh = self.get_mesh(obj).triangulate().cell_data_to_point_data()
+                mesh.set_active_scalars("colors", preference="point")
+                mesh = mesh.decimate(decimate, enable_all_attribute_error=True)
+                if "colors" in mesh.point_data:
+                    colors = np.clip(np.round(mesh.point_data["colors"]), 0, 255)
+                    mesh.point_data["colors"] = colors.astype(np.uint8)
+            else:
+                vertices, faces, colors = self.get_data(obj)
+                mesh = pv.PolyData(vertices, faces)
+                mesh.cell_data["colors"] = colors
+            # the object is kept, such that its id is not reused
+            self.meshes[key] = (obj, mesh)
+        return self.meshes[key][1]
+
+    # Forgets the cached meshes of obj (of all objects if None), eg after
+    # its colors changed
+    def invalidate(self, obj=None):
+        if obj is None:
+            self.meshes = {}
+        else:
+            self.meshes = {k: v for k, v in self.meshes.items() if k[0] != id(obj)}
+
+    def display_object(self, obj, offset, decimate=None):
+        mesh = self.get_mesh(obj, decimate).copy()
+        mesh.points += np.array([offset.x, offset.y, offset.z])
+        colors = "colors" in mesh.array_names
+        self.p.add_mesh(mesh, show_edges=not decimate, line_width=1, scalars="colors" if colors else None,
+                        preference='point' if decimate else 'cell', rgb=colors)
 
     def display_points(self, cps, offset, color):
         points = []